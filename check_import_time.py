@@ -0,0 +1,74 @@
+"""
+Перевірка часу імпорту monitor.py через `python -X importtime`.
+
+Шлях "змін немає" не повинен тягнути браузер, обробку зображень і Telegram,
+а загальний час імпорту має вкладатися в бюджет.
+Запуск: python check_import_time.py [--budget-ms 400] [--module monitor]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Модулі, які мають вантажитись лише коли виявлено зміни
+HEAVY_MODULES = ("playwright", "bs4", "PIL", "telegram")
+
+DEFAULT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "400"))
+
+
+def measure_imports(module: str) -> List[Tuple[str, int, int]]:
+    """Повертає [(модуль, self_us, cumulative_us), ...] з виводу -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} впав:\n{proc.stderr[-2000:]}")
+
+    rows: List[Tuple[str, int, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        # "import time:       446 |        446 |   _typing"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="monitor")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    rows = measure_imports(args.module)
+    cumulative: Dict[str, int] = {name: cum for name, _, cum in rows}
+    total_ms = cumulative.get(args.module, 0) / 1000
+
+    heavy = sorted({
+        name for name, _, _ in rows
+        if name.split(".")[0] in HEAVY_MODULES
+    })
+    top = sorted(rows, key=lambda r: r[1], reverse=True)[:10]
+
+    print(f"import {args.module}: {total_ms:.1f} ms (бюджет {args.budget_ms} ms)")
+    for name, self_us, _ in top:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"❌ Важкі модулі імпортуються одразу: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ Час імпорту {total_ms:.1f} ms перевищує бюджет {args.budget_ms} ms")
+        failed = True
+
+    if not failed:
+        print("✅ Імпорт у межах бюджету")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Доставка сповіщень у Telegram і конвеєр обробки змін.
+
+Модуль імпортується з monitor.py лише коли є що надсилати (зміни
+або нагадування), тож asyncio, браузер і python-telegram-bot не
+потрапляють у час старту запусків без змін.
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from log_utils import log_to_buffer
+from telegram_handler import send_notification_async
+
+# Скільки секунд чекати на браузер, перш ніж слати текст без картинки
+CAPTURE_DEADLINE = float(os.getenv("CAPTURE_DEADLINE", "45"))
+
+CAPTION_LIMIT = 1024  # Ліміт для caption з фото
+TEXT_LIMIT = 4096     # Ліміт для звичайного text повідомлення
+
+
+async def send_notification_safe_async(
+    message: str, img_path=None, channel_id: Optional[str] = None
+) -> bool:
+    """Надсилає повідомлення з перевіркою лімітів Telegram"""
+    # Без явного каналу — канал за замовчуванням з telegram_handler
+    target = {"channel_id": channel_id} if channel_id else {}
+
+    msg_len = len(message)
+    log_to_buffer(f"📝 Довжина повідомлення: {msg_len} символів")
+
+    # Якщо є фото і текст не влазить в caption
+    if img_path and msg_len > CAPTION_LIMIT:
+        log_to_buffer(f"⚠️ Текст {msg_len} > {CAPTION_LIMIT} (ліміт caption), надсилаю спочатку фото, потім текст")
+        # Спочатку надсилаємо фото без тексту
+        await send_notification_async("📸", img_path, **target)
+        # Потім надсилаємо текст окремим повідомленням
+        if msg_len > TEXT_LIMIT:
+            log_to_buffer(f"⚠️ Текст {msg_len} > {TEXT_LIMIT}, обрізаю")
+            message = message[:TEXT_LIMIT-100] + "\n\n... (текст скорочено)"
+        return await send_notification_async(message, None, **target)
+
+    # Якщо немає фото, але текст завеликий для text повідомлення
+    if not img_path and msg_len > TEXT_LIMIT:
+        log_to_buffer(f"⚠️ Текст {msg_len} > {TEXT_LIMIT}, обрізаю")
+        message = message[:TEXT_LIMIT-100] + "\n\n... (текст скорочено)"
+
+    return await send_notification_async(message, img_path, **target)
+
+
+async def send_to_channels_async(message: str, img_path, channels: List[str]) -> bool:
+    """Надсилає повідомлення в усі канали провайдера одночасно. True — якщо всі успішні."""
+    # Порожній список буває лише в провайдера з env (load_providers вимагає
+    # канали для записів реєстру) — для нього канал за замовчуванням і є своїм
+    if not channels:
+        return await send_notification_safe_async(message, img_path)
+
+    results = await asyncio.gather(*(
+        send_notification_safe_async(message, img_path, channel_id)
+        for channel_id in channels
+    ))
+    return all(results)
+
+
+def send_to_channels(message: str, img_path, channels: List[str]) -> bool:
+    """Синхронна обгортка над send_to_channels_async."""
+    return asyncio.run(send_to_channels_async(message, img_path, channels))
+
+
+async def _await_until(task: asyncio.Future, deadline: float, what: str):
+    """Чекає task до абсолютного дедлайну (loop.time()); None — якщо не встиг."""
+    timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+    except asyncio.TimeoutError:
+        log_to_buffer(f"⏱ {what}: не вклались у дедлайн {CAPTURE_DEADLINE:.0f} с")
+        return None
+
+
+async def _send_logged(message: str, img_path, channels: List[str], label: str) -> bool:
+    ok = await send_to_channels_async(message, img_path, channels)
+    if ok:
+        log_to_buffer(f"✅ Повідомлення про {label} відправлено")
+    else:
+        log_to_buffer(f"❌ Помилка надсилання повідомлення про {label}")
+    return ok
+
+
+async def deliver_changes(provider: Dict, render: Callable[[str], Tuple[str, str]]) -> None:
+    """
+    Конвеєр обробки змін: дата оновлення і скріншот знімаються паралельно
+    у фонових потоках, повідомлення без фото йде одразу, як тільки готовий
+    текст, а незалежні повідомлення надсилаються одночасно.
+    render(дата оновлення) -> (повідомлення про зміни, про новий графік);
+    порожній рядок — повідомлення не потрібне.
+    Якщо скріншот не встиг до CAPTURE_DEADLINE — текст іде без картинки.
+    Без url провайдера сайт не знімається зовсім: чужа сторінка
+    не повинна потрапити в його повідомлення.
+    """
+    url = provider.get("url")
+    channels = provider.get("channels") or []
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CAPTURE_DEADLINE
+
+    # 6-7. Дата оновлення і скріншот — одночасно
+    date_task = shot_task = None
+    if url:
+        # Playwright, BeautifulSoup і Pillow потрібні лише коли є зміни
+        from site_content import get_schedule_content, take_screenshot_between_elements
+
+        date_task = asyncio.ensure_future(asyncio.to_thread(get_schedule_content, url))
+        shot_task = asyncio.ensure_future(asyncio.to_thread(
+            take_screenshot_between_elements,
+            url, provider.get("screenshot_path") or "screenshot.png",
+        ))
+    else:
+        log_to_buffer(f"⚠️ {provider['id']}: url сайту не задано, надсилаю лише текст")
+
+    # 8. Текст повідомлень — щойно відома дата оновлення
+    content = await _await_until(date_task, deadline, "Дата оновлення") if date_task else None
+    date_content = (content[1] if content else None) or ""
+    changes_msg, new_msg = render(date_content)
+
+    # 9. Фото йде з повідомленням про зміни, а якщо його нема — з новим графіком
+    sends = []
+    if changes_msg:
+        photo_msg, photo_label = changes_msg, "зміни"
+        if new_msg:
+            # Новий графік без фото — не чекає на скріншот
+            log_to_buffer("📤 Надсилаю повідомлення про новий графік (без фото)")
+            sends.append(asyncio.ensure_future(
+                _send_logged(new_msg, None, channels, "новий графік")
+            ))
+    else:
+        photo_msg, photo_label = new_msg, "новий графік"
+
+    if photo_msg:
+        shot = await _await_until(shot_task, deadline, "Скріншот") if shot_task else None
+        screenshot_path = shot[0] if shot else None
+        if not screenshot_path and shot_task:
+            log_to_buffer("⚠️ Не вдалося створити скріншот, надсилаю без фото")
+        img_path = Path(screenshot_path) if screenshot_path else None
+
+        log_to_buffer(f"📤 Надсилаю повідомлення про {photo_label}" + (" + фото" if img_path else ""))
+        sends.append(asyncio.ensure_future(
+            _send_logged(photo_msg, img_path, channels, photo_label)
+        ))
+
+    if sends:
+        await asyncio.gather(*sends)
+
+
+def deliver(provider: Dict, render: Callable[[str], Tuple[str, str]]) -> None:
+    """Синхронна обгортка над deliver_changes."""
+    asyncio.run(deliver_changes(provider, render))
@@ -1,5 +1,6 @@
 import os
 import io
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List
 import pytz
@@ -10,11 +11,24 @@ TELEGRAM_LOG_CHANNEL_ID = os.getenv("TELEGRAM_LOG_CHANNEL_ID")
 UKRAINE_TZ = pytz.timezone("Europe/Kyiv")
 
 log_messages: List[str] = []
+_muted = False
 
 def get_ukraine_time() -> datetime:
     return datetime.now().astimezone(UKRAINE_TZ)
 
+@contextmanager
+def muted_logs():
+    """Тимчасово вимикає log_to_buffer (офлайн-прогони на тисячах знімків)."""
+    global _muted
+    previous, _muted = _muted, True
+    try:
+        yield
+    finally:
+        _muted = previous
+
 def log_to_buffer(message: str) -> None:
+    if _muted:
+        return
     ts = get_ukraine_time().strftime("%H:%M:%S")
     line = f"{ts} - {message}"
     print(line)
@@ -1,85 +1,149 @@
 import os
 import json
-import hashlib
 import shutil
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 from log_utils import log_to_buffer, send_log_to_channel
-from site_content import get_schedule_content, take_screenshot_between_elements
-from telegram_handler import send_notification
+from providers import DATA_DIR, DEFAULT_QUEUES, load_providers
+from schedule_core import (
+    OutageIndex,
+    ChangesIndex,
+    calculate_hash,
+    save_json,
+    FETCH_WORKERS,
+    HASH_FILE_NAME,
+    MAX_RESPONSE_BYTES,
+    RESPONSE_CHUNK_SIZE,
+    iter_schedule_records,
+    rows_main_hash,
+    parse_span,
+    format_time,
+    queue_sort_key,
+    build_outage_index,
+    build_changes_index,
+    datetime_to_minute,
+    local_now,
+    Summaries,
+    update_summaries,
+    format_minutes,
+)
+from reminders import (
+    ReminderScheduler,
+    build_reminder_notification,
+    load_scheduler,
+    save_scheduler,
+)
+from state_lock import state_lock
 
 API_BASE_URL = os.getenv("API_BASE_URL")
-URL = os.environ.get('URL')
-SUBSCRIBE = os.environ.get('SUBSCRIBE')
 
-QUEUES = [(i, j) for i in range(1, 7) for j in range(1, 2 + 1)]
+# Пул процесів для build_state/build_diff; вмикається від PARALLEL_MIN_QUEUES черг,
+# 0 — вимкнено (за замовчуванням). Заміри на 600 чергах × 7 днів × 48 інтервалів:
+# build_state у поточному процесі ≈0.70 с, з них у воркери йде лише хешування
+# ≈0.28 с, а серіалізація кортежів туди і хешів назад коштує батьківському
+# процесу ≈0.22 с плюс старт пулу. Співвідношення не залежить від кількості
+# черг, тож пул окупається хіба на машинах з багатьма ядрами — вмикати вручну.
+STATE_WORKERS = int(os.getenv("STATE_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_QUEUES = int(os.getenv("PARALLEL_MIN_QUEUES", "0"))
 
-DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
 CURRENT_FILE = DATA_DIR / "current.json"
 PREVIOUS_FILE = DATA_DIR / "previous.json"
-HASH_FILE = DATA_DIR / "last_hash.json"
+HASH_FILE = DATA_DIR / HASH_FILE_NAME
 
 
-def fetch_schedule(cherga_id: int, pidcherga_id: int) -> Tuple[List[Dict], bool]:
+def fetch_schedule(
+    cherga_id: int,
+    pidcherga_id: int,
+    api_base_url: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+) -> Tuple[List[Dict], bool]:
     """
     Тягне графік для однієї черги.
-    Повертає (дані, is_error).
+    Відповідь розбирається потоково: записи нормалізуються по мірі надходження,
+    зіпсовані записи відкидаються поодинці.
+    Повертає (нормалізовані записи, is_error).
     """
     resp: Optional[requests.Response] = None
+    http = session or requests
+    head: List[bytes] = []  # початок відповіді — для логу помилки
+
+    def _chunks():
+        for chunk in resp.iter_content(chunk_size=RESPONSE_CHUNK_SIZE):
+            if not head:
+                head.append(chunk[:200])
+            yield chunk
+
     try:
         params = {"cherga_id": cherga_id, "pidcherga_id": pidcherga_id}
-        resp = requests.get(API_BASE_URL, params=params, timeout=10)
+        resp = http.get(api_base_url or API_BASE_URL, params=params, timeout=10, stream=True)
         resp.raise_for_status()
-        text = resp.text.strip()
-        if text.startswith("[") and text.endswith("]"):
-            data = json.loads(text)
-        else:
-            if text.startswith("{"):
-                text = f"[{text}]"
-            data = json.loads(text)
 
-        if isinstance(data, list):
-            return data, False
-
-        log_to_buffer(f"⚠️ Відповідь не список для {cherga_id}.{pidcherga_id}")
-        return [], False
+        rejected: List[str] = []
+        data = list(iter_schedule_records(
+            _chunks(), cherga_id, pidcherga_id, rejected, MAX_RESPONSE_BYTES
+        ))
+        if rejected:
+            log_to_buffer(
+                f"⚠️ {cherga_id}.{pidcherga_id}: відкинуто {len(rejected)} записів "
+                f"(перший: {rejected[0]})"
+            )
+        return data, False
 
     except Exception as e:
-        body = resp.text[:200] if resp is not None else ""
+        body = head[0].decode("utf-8", errors="replace") if head else ""
         log_to_buffer(
             f"❌ Помилка {cherga_id}.{pidcherga_id}: {e}. "
             f"Фрагмент відповіді: {body}"
         )
         return [], True
+    finally:
+        if resp is not None:
+            resp.close()
 
 
-def fetch_all_schedules() -> Tuple[Dict[str, List[Dict]], Dict[str, bool]]:
-    """Повертає (дані, словник помилок)."""
+def fetch_all_schedules(
+    queues: Optional[List[Tuple[int, int]]] = None,
+    api_base_url: Optional[str] = None,
+) -> Tuple[Dict[str, List[Dict]], Dict[str, bool]]:
+    """
+    Повертає (дані, словник помилок).
+    Запити йдуть паралельно через одну сесію (keep-alive),
+    результати складаються в порядку черг.
+    """
+    queues = queues if queues is not None else DEFAULT_QUEUES
     all_schedules: Dict[str, List[Dict]] = {}
     has_error: Dict[str, bool] = {}
 
-    log_to_buffer("📡 Завантажую графіки по всіх чергах...")
-    for cherga_id, pidcherga_id in QUEUES:
-        queue_key = f"{cherga_id}.{pidcherga_id}"
-        schedule, is_error = fetch_schedule(cherga_id, pidcherga_id)
-        all_schedules[queue_key] = schedule
-        has_error[queue_key] = is_error
-
-        error_note = " [помилка API]" if is_error else ""
-        log_to_buffer(f" ✓ {queue_key}: {len(schedule)} записів{error_note}")
+    log_to_buffer(f"📡 Завантажую графіки по {len(queues)} чергах...")
+    with requests.Session() as session:
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(FETCH_WORKERS, 1)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
 
-    return all_schedules, has_error
+        with ThreadPoolExecutor(max_workers=max(FETCH_WORKERS, 1)) as pool:
+            results = pool.map(
+                lambda q: fetch_schedule(q[0], q[1], api_base_url, session),
+                queues,
+            )
+            for (cherga_id, pidcherga_id), (schedule, is_error) in zip(queues, results):
+                queue_key = f"{cherga_id}.{pidcherga_id}"
+                all_schedules[queue_key] = schedule
+                has_error[queue_key] = is_error
 
+                error_note = " [помилка API]" if is_error else ""
+                log_to_buffer(f" ✓ {queue_key}: {len(schedule)} записів{error_note}")
 
-def save_json(data, path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    return all_schedules, has_error
 
 
 def load_json(path: Path):
@@ -92,29 +156,63 @@ def load_json(path: Path):
         return {}
 
 
-def calculate_hash(obj) -> str:
-    json_str = json.dumps(obj, sort_keys=True, ensure_ascii=False)
-    return hashlib.md5(json_str.encode("utf-8")).hexdigest()
+def _hash_queue_rows(
+    queue_key: str,
+    rows: List[Tuple[str, str, str]],
+) -> Tuple[str, str, Dict[str, Dict[str, str]]]:
+    """
+    Хеші однієї черги з відсортованих кортежів (date, span, color).
+    Чиста функція — безпечна для пулу процесів; у воркер ідуть лише
+    кортежі, а назад — лише хеші, записи лишаються в батьківському процесі.
+    """
+    # Головний хеш черги — від color кожного інтервалу
+    main_hash = rows_main_hash(rows)
 
+    # Хеші по кожному інтервалу; кольорів кілька, тож хеш кожного рахується раз
+    color_hashes: Dict[str, str] = {}
+    sh: Dict[str, Dict[str, str]] = {}
+    for d, span, color in rows:
+        span_hash = color_hashes.get(color)
+        if span_hash is None:
+            span_hash = color_hashes[color] = calculate_hash({"color": color})
+        if d not in sh:
+            sh[d] = {}
+        sh[d][span] = span_hash
 
-def normalize_record(rec: Dict, cherga_id: int, pidcherga_id: int) -> Dict:
-    """Нормалізація одного запису."""
-    date = rec.get("date", "")
-    span = rec.get("span", "")
-    color = rec.get("color", "").strip().lower()
+    return queue_key, main_hash, sh
 
-    return {
-        "cherga": cherga_id,
-        "pidcherga": pidcherga_id,
-        "queue_key": f"{cherga_id}.{pidcherga_id}",
-        "date": date,
-        "span": span,
-        "color": color,
-    }
+
+def _hash_state_shard(items: List[Tuple[str, List[Tuple[str, str, str]]]]) -> List[Tuple]:
+    return [_hash_queue_rows(queue_key, rows) for queue_key, rows in items]
+
+
+def _run_sharded(shard_func, items: List) -> List:
+    """
+    Розбиває items на шарди по чергах і обробляє їх у пулі процесів.
+    Результати повертаються в порядку items, тож злиття детерміноване.
+    Для невеликої кількості черг (або з вимкненим пулом) усе рахується
+    в поточному процесі.
+    """
+    if STATE_WORKERS <= 1 or not PARALLEL_MIN_QUEUES or len(items) < PARALLEL_MIN_QUEUES:
+        return shard_func(items)
+
+    # multiprocessing потрібен лише на великих наборах черг
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Кілька шардів на воркер, щоб вирівняти навантаження
+    n_shards = min(len(items), STATE_WORKERS * 4)
+    size = -(-len(items) // n_shards)
+    shards = [items[k:k + size] for k in range(0, len(items), size)]
+
+    results: List = []
+    with ProcessPoolExecutor(max_workers=STATE_WORKERS) as pool:
+        for shard_result in pool.map(shard_func, shards):
+            results.extend(shard_result)
+    return results
 
 
 def build_state(
-    raw_schedules: Dict[str, List[Dict]],
+    schedules: Dict[str, List[Dict]],
     has_error: Dict[str, bool],
 ) -> Tuple[
     Dict[str, List[Dict]], # norm_by_queue
@@ -122,53 +220,38 @@ def build_state(
     Dict[str, Dict[str, Dict[str, str]]] # span_hashes[queue][date][span]
 ]:
     """
-    Будує нормалізований стан з хешами по інтервалах.
+    Будує стан з хешами по інтервалах.
+    schedules — нормалізовані записи по чергах (результат fetch_all_schedules).
     """
     norm_by_queue: Dict[str, List[Dict]] = {}
     main_hashes: Dict[str, str] = {}
     span_hashes: Dict[str, Dict[str, Dict[str, str]]] = {}
 
-    for queue_key, schedule in raw_schedules.items():
+    items = []
+    for queue_key, schedule in schedules.items():
         if has_error.get(queue_key, False):
             continue
+        schedule.sort(key=lambda r: (r["date"], r["span"]))
+        norm_by_queue[queue_key] = schedule
+        items.append((queue_key, [(r["date"], r["span"], r["color"]) for r in schedule]))
 
-        cherga_id, pidcherga_id = map(int, queue_key.split("."))
-        norm_list: List[Dict] = []
-
-        for rec in schedule:
-            nrec = normalize_record(rec, cherga_id, pidcherga_id)
-            norm_list.append(nrec)
-
-        norm_list.sort(key=lambda r: (r["date"], r["span"]))
-        norm_by_queue[queue_key] = norm_list
-
-        # Головний хеш черги — від color кожного інтервалу
-        main_hash_data = [{"date": r["date"], "span": r["span"], "color": r["color"]} for r in norm_list]
-        main_hashes[queue_key] = calculate_hash(main_hash_data)
-
-        # Хеші по кожному інтервалу
-        sh: Dict[str, Dict[str, str]] = {}
-        for rec in norm_list:
-            d = rec["date"]
-            span = rec["span"]
-            if d not in sh:
-                sh[d] = {}
-            sh[d][span] = calculate_hash({"color": rec["color"]})
-        
+    for queue_key, main_hash, sh in _run_sharded(_hash_state_shard, items):
+        main_hashes[queue_key] = main_hash
         span_hashes[queue_key] = sh
 
     return norm_by_queue, main_hashes, span_hashes
 
 
-def load_last_state():
+def load_last_state(data_dir: Path = DATA_DIR):
     """Завантажує хеші з last_hash.json + дані з previous.json"""
-    hash_data = load_json(HASH_FILE)
-    prev_norm = load_json(PREVIOUS_FILE)
+    hash_data = load_json(data_dir / HASH_FILE.name)
+    prev_norm = load_json(data_dir / PREVIOUS_FILE.name)
     
     return {
         "timestamp": hash_data.get("timestamp"),
         "main_hashes": hash_data.get("main_hashes", {}),
         "span_hashes": hash_data.get("span_hashes", {}),
+        "summaries": hash_data.get("summaries", {}),
         "norm_by_queue": prev_norm,
     }
 
@@ -176,26 +259,18 @@ def load_last_state():
 def save_state(
     main_hashes: Dict[str, str],
     span_hashes: Dict[str, Dict[str, Dict[str, str]]],
-    timestamp: str
+    timestamp: str,
+    data_dir: Path = DATA_DIR,
+    summaries: Optional[Summaries] = None,
 ) -> None:
-    """Зберігає тільки хеші в last_hash.json"""
+    """Зберігає хеші й денні підсумки по чергах у last_hash.json"""
     data = {
         "timestamp": timestamp,
         "main_hashes": main_hashes,
         "span_hashes": span_hashes,
+        "summaries": summaries or {},
     }
-    save_json(data, HASH_FILE)
-
-
-def parse_span(span: str) -> Tuple[str, str]:
-    """0000-0030 або 00:00-00:30 -> (00:00, 00:30)"""
-    if not span or "-" not in span:
-        return ("", "")
-    start, end = span.split("-")
-    # Якщо вже є двокрапка, повертаємо як є
-    if ":" in start:
-        return start, end
-    return f"{start[:2]}:{start[2:]}", f"{end[:2]}:{end[2:]}"
+    save_json(data, data_dir / HASH_FILE.name)
 
 
 def group_spans(spans_changes: List[Dict]) -> List[Dict]:
@@ -229,6 +304,91 @@ def group_spans(spans_changes: List[Dict]) -> List[Dict]:
     return result
 
 
+def _diff_queue(
+    queue_key: str,
+    cur_sh: Dict[str, Dict[str, str]],
+    old_sh: Dict[str, Dict[str, str]],
+    cur_records: List[Dict],
+    old_records: List[Dict],
+) -> Tuple[str, Optional[Dict], List[str], List[str]]:
+    """
+    Деталізує зміни для однієї черги, у якої змінився головний хеш.
+    Повертає також дати, де змінився хоч один хеш інтервалу (dirty) —
+    за ними інкрементно оновлюються денні підсумки.
+    Лог не пишеться одразу, а повертається списком рядків —
+    так функція працює і в дочірньому процесі.
+    """
+    logs: List[str] = [f"🔍 Аналізую зміни для {queue_key}"]
+
+    new_dates = []
+    if not old_sh:
+        # Порожній old_sh = це "перший запуск з даними"
+        new_dates = sorted(cur_sh.keys())  # Всі поточні дати = нові!
+        logs.append(f"{queue_key}: new data from empty state!")
+    else:
+        new_dates = sorted(d for d in cur_sh.keys() if d not in old_sh)
+
+    if new_dates:
+        logs.append(f" 📅 Нові дати: {new_dates}")
+
+    changed_dates = {}
+    dirty_dates = list(new_dates)
+    # Індекси (date, span) -> запис, щоб не сканувати список на кожен інтервал
+    cur_items = {(r["date"], r["span"]): r for r in cur_records}
+    old_items = {(r["date"], r["span"]): r for r in old_records}
+
+    new_dates_set = set(new_dates)
+    for d in cur_sh.keys():
+        if d in new_dates_set:
+            continue
+
+        # Порівнюємо хеші інтервалів для цієї дати
+        cur_spans = cur_sh.get(d, {})
+        old_spans = old_sh.get(d, {})
+        if cur_spans == old_spans:
+            continue
+        dirty_dates.append(d)
+
+        changes_for_date = []
+
+        for span, cur_span_hash in cur_spans.items():
+            old_span_hash = old_spans.get(span)
+            if old_span_hash == cur_span_hash:
+                continue
+
+            # Хеш інтервалу змінився
+            logs.append(f" 🔄 Інтервал {span} дата {d}: хеш змінився")
+
+            # Знаходимо старий і новий запис
+            new_rec = cur_items.get((d, span))
+            old_rec = old_items.get((d, span))
+
+            if new_rec and old_rec:
+                logs.append(f" Старий: color={old_rec['color']}, Новий: color={new_rec['color']}")
+                if new_rec["color"] != old_rec["color"]:
+                    change = "added" if new_rec["color"] == "red" else "removed"
+                    changes_for_date.append({"span": span, "change": change})
+                    logs.append(f" ✅ Зміна: {change}")
+            else:
+                logs.append(f" ⚠️ Не знайдено запис: new_rec={bool(new_rec)}, old_rec={bool(old_rec)}")
+
+        if changes_for_date:
+            grouped = group_spans(changes_for_date)
+            changed_dates[d] = grouped
+            logs.append(f" ✅ Для дати {d} знайдено {len(changes_for_date)} змін")
+
+    if new_dates or changed_dates:
+        logs.append(f"✅ Додано {queue_key} до diff")
+        return queue_key, {"new_dates": new_dates, "changed_dates": changed_dates}, dirty_dates, logs
+
+    logs.append(f"⚠️ Хеш змінився для {queue_key}, але конкретні зміни не виявлені")
+    return queue_key, None, dirty_dates, logs
+
+
+def _diff_shard(items: List[Tuple]) -> List[Tuple]:
+    return [_diff_queue(*item) for item in items]
+
+
 def build_diff(
     norm_by_queue: Dict[str, List[Dict]],
     main_hashes: Dict[str, str],
@@ -243,193 +403,166 @@ def build_diff(
         "queues": [],
         "per_queue": {},
         "new_dates": [],  # Глобальний список нових дат
+        "dirty_dates": {},  # Черга -> дати зі зміненими хешами інтервалів
     }
+    seen_new_dates = set()
 
+    # Дешевий відбір по головних хешах — у пул ідуть лише змінені черги
+    items = []
     for queue_key, cur_main_hash in main_hashes.items():
         old_main_hash = last_main.get(queue_key)
-        
+
         if old_main_hash is None:
             log_to_buffer(f"ℹ️ Перший запуск для {queue_key}, пропускаємо")
             continue
-        
+
         if old_main_hash == cur_main_hash:
             continue
 
-        # Є зміни — шукаємо деталі
-        log_to_buffer(f"🔍 Аналізую зміни для {queue_key}")
-
-        cur_sh = span_hashes.get(queue_key, {})
-        old_sh = last_span.get(queue_key, {})
-        
-        new_dates = []
-        if not old_sh:
-            # Порожній old_sh = це "перший запуск з даними"
-            new_dates = sorted(cur_sh.keys())  # Всі поточні дати = нові!
-            log_to_buffer(f"{queue_key}: new data from empty state!")
-        else:
-            new_dates = sorted(d for d in cur_sh.keys() if d not in old_sh)
-        
-        if new_dates:
-            log_to_buffer(f" 📅 Нові дати: {new_dates}")
-            # Додаємо до глобального списку
-            for nd in new_dates:
-                if nd not in diff["new_dates"]:
-                    diff["new_dates"].append(nd)
-        
-        changed_dates = {}
-        cur_items = norm_by_queue.get(queue_key, [])
-        old_items_list = last_norm.get(queue_key, [])
-
-        for d in cur_sh.keys():
-            if d in new_dates:
-                continue
-            
-            # Порівнюємо хеші інтервалів для цієї дати
-            cur_spans = cur_sh.get(d, {})
-            old_spans = old_sh.get(d, {})
-            
-            changes_for_date = []
-            
-            for span, cur_span_hash in cur_spans.items():
-                old_span_hash = old_spans.get(span)
-                if old_span_hash == cur_span_hash:
-                    continue
-                
-                # Хеш інтервалу змінився
-                log_to_buffer(f" 🔄 Інтервал {span} дата {d}: хеш змінився")
-                
-                # Знаходимо старий і новий запис
-                new_rec = next((r for r in cur_items if r["date"] == d and r["span"] == span), None)
-                old_rec = next((r for r in old_items_list if r["date"] == d and r["span"] == span), None)
-                
-                if new_rec and old_rec:
-                    log_to_buffer(f" Старий: color={old_rec['color']}, Новий: color={new_rec['color']}")
-                    if new_rec["color"] != old_rec["color"]:
-                        change = "added" if new_rec["color"] == "red" else "removed"
-                        changes_for_date.append({"span": span, "change": change})
-                        log_to_buffer(f" ✅ Зміна: {change}")
-                else:
-                    log_to_buffer(f" ⚠️ Не знайдено запис: new_rec={bool(new_rec)}, old_rec={bool(old_rec)}")
-
-            if changes_for_date:
-                grouped = group_spans(changes_for_date)
-                changed_dates[d] = grouped
-                log_to_buffer(f" ✅ Для дати {d} знайдено {len(changes_for_date)} змін")
-
-        if new_dates or changed_dates:
-            diff["queues"].append(queue_key)
-            diff["per_queue"][queue_key] = {
-                "new_dates": new_dates,
-                "changed_dates": changed_dates,
-            }
-            log_to_buffer(f"✅ Додано {queue_key} до diff")
-        else:
-            log_to_buffer(f"⚠️ Хеш змінився для {queue_key}, але конкретні зміни не виявлені")
+        items.append((
+            queue_key,
+            span_hashes.get(queue_key, {}),
+            last_span.get(queue_key, {}),
+            norm_by_queue.get(queue_key, []),
+            last_norm.get(queue_key, []),
+        ))
+
+    for queue_key, entry, dirty_dates, logs in _run_sharded(_diff_shard, items):
+        for line in logs:
+            log_to_buffer(line)
+        if dirty_dates:
+            diff["dirty_dates"][queue_key] = dirty_dates
+        if entry is None:
+            continue
+
+        # Додаємо до глобального списку
+        for nd in entry["new_dates"]:
+            if nd not in seen_new_dates:
+                seen_new_dates.add(nd)
+                diff["new_dates"].append(nd)
+
+        diff["queues"].append(queue_key)
+        diff["per_queue"][queue_key] = entry
 
     return diff
 
 
+def _summary_delta_line(
+    summaries: Optional[Summaries],
+    prev_summaries: Optional[Summaries],
+    queue_key: str,
+    date: str,
+) -> str:
+    """"⏱ Разом 7 год (+1 год)" з денних підсумків; порожньо, якщо порівнювати нема з чим."""
+    cur = (summaries or {}).get(queue_key, {}).get(date)
+    old = (prev_summaries or {}).get(queue_key, {}).get(date)
+    if not cur or not old:
+        return ""
+    delta = cur["outage_minutes"] - old["outage_minutes"]
+    if not delta:
+        return ""
+    sign = "+" if delta > 0 else "−"
+    return f"⏱ Разом {format_minutes(cur['outage_minutes'])} ({sign}{format_minutes(delta)})"
+
+
 def build_changes_notification(
     diff: Dict,
     url: str,
     subscribe: str,
-    update_str: str
+    update_str: str,
+    site_name: str = "ЖОЕ",
+    changes_index: Optional[ChangesIndex] = None,
+    summaries: Optional[Summaries] = None,
+    prev_summaries: Optional[Summaries] = None,
 ) -> str:
-    """Повідомлення про зміни в ІСНУЮЧИХ датах"""
-    
+    """
+    Повідомлення про зміни в ІСНУЮЧИХ датах.
+    Якщо передано підсумки до і після — під кожною чергою додається
+    різниця сумарного часу без світла (без перерахунку записів).
+    """
+
+    # Дата -> черга -> зміни; будується один раз на запуск
+    if changes_index is None:
+        changes_index = build_changes_index(diff)
+
     # Беремо тільки черги що мають changed_dates
-    queues_with_changes = []
-    for q in sorted(diff["queues"]):
-        info = diff["per_queue"].get(q, {})
-        if info.get("changed_dates"):
-            queues_with_changes.append(q)
-    
-    if not queues_with_changes:
+    queues = sorted({q for by_queue in changes_index.values() for q in by_queue})
+
+    if not queues:
         return ""
-    
-    queues = queues_with_changes
-    
+
     parts = []
     parts.append(f"Для черг {', '.join(queues)} 🔔 ОНОВЛЕННЯ ГРАФІКА ВІДКЛЮЧЕНЬ!")
     parts.append("⬇️⬇️⬇️\n")
-    
+
     # Дата оновлення
     update_date_str = ""
     if update_str:
         match = re.search(r'(\d{2}:\d{2})\s+(\d{2}\.\d{2})\.\d{4}', update_str)
         if match:
             update_date_str = f"🕐 {match.group(1)} {match.group(2)}"
-    
-    # Збираємо тільки дати зі ЗМІНАМИ (не нові)
-    dates_with_changes = set()
-    for q in queues:
-        info = diff["per_queue"].get(q, {})
-        for d in info.get("changed_dates", {}).keys():
-            dates_with_changes.add(d)
-    
-    # Обробляємо кожну дату
-    for date in sorted(dates_with_changes):
+
+    # Обробляємо тільки дати зі ЗМІНАМИ (не нові)
+    for date in sorted(changes_index):
         try:
             dt = datetime.strptime(date, "%Y-%m-%d")
             formatted_date = dt.strftime("%d.%m.%Y")
         except ValueError:
             formatted_date = date
-        
+
         parts.append(f"🗓 {formatted_date}\n")
-        
-        for queue_key in sorted(queues, key=lambda x: tuple(map(int, x.split(".")))):
-            queue_info = diff["per_queue"].get(queue_key, {})
-            
-            if date not in queue_info.get("changed_dates", {}):
-                continue
-            
+
+        by_queue = changes_index[date]
+        for queue_key in sorted(by_queue, key=queue_sort_key):
             parts.append(f"▶️ Черга {queue_key}:")
-            
-            ranges = queue_info["changed_dates"][date]
-            for r in ranges:
-                start = r['start'].lstrip('0') or '0:00'
-                end = r['end'].lstrip('0') or '0:00'
-                if start.startswith(':'):
-                    start = '0' + start
-                if end.startswith(':'):
-                    end = '0' + end
+
+            for r in by_queue[queue_key]:
+                start = format_time(r["start"])
+                end = format_time(r["end"])
                 if r["change"] == "added":
                     action = "🪫 додали відключення"
                     parts.append(f"{start}-{end} {action}")
                 else:
                     action = "🔋 скасували відключення"
                     parts.append(f"<s>{start}-{end}</s> {action}")
-            
+
+            delta_line = _summary_delta_line(summaries, prev_summaries, queue_key, date)
+            if delta_line:
+                parts.append(delta_line)
+
             parts.append("")  # Порожній рядок після КОЖНОЇ черги
-        
+
         parts.append("======\n")
-    
+
     # Посилання
     parts.append(
-        f'<a href="{url}">🔗 Сайт "ЖОЕ"</a> | '
+        f'<a href="{url}">🔗 Сайт "{site_name}"</a> | '
         f'<a href="{subscribe}">⚡️ ПІДПИСАТИСЯ</a>'
     )
     if update_date_str:
         parts.append(update_date_str)
-    
+
     return "\n".join(parts)
 
 
 def build_new_schedule_notification(
     diff: Dict,
-    norm_by_queue: Dict[str, List[Dict]],
+    outage_index: OutageIndex,
     url: str,
     subscribe: str,
-    update_str: str
+    update_str: str,
+    site_name: str = "ЖОЕ",
 ) -> str:
-    """Компактне повідомлення про НОВИЙ графік"""
+    """
+    Компактне повідомлення про НОВИЙ графік.
+    outage_index — з build_outage_index (дата -> черга -> діапазони).
+    """
 
     # Беремо тільки черги що мають нові дати
-    queues_with_new_dates = []
-    for q in sorted(diff["queues"]):
-        info = diff["per_queue"].get(q, {})
-        if info.get("new_dates"):
-            queues_with_new_dates.append(q)
+    queues_with_new_dates = {
+        q for q in diff["queues"]
+        if diff["per_queue"].get(q, {}).get("new_dates")
+    }
 
     if not queues_with_new_dates:
         return ""
@@ -455,41 +588,25 @@ def build_new_schedule_notification(
 
         parts.append(f"🗓 {formatted_date}\n")
 
-        # Отримуємо всі черги що мають відключення на цю дату
-        for queue_key in sorted(
-            queues_with_new_dates, key=lambda x: tuple(map(int, x.split(".")))
-        ):
-            records = norm_by_queue.get(queue_key, [])
-            outages = [
-                r for r in records
-                if r["date"] == date and r["color"] == "red"
-            ]
-
-            if outages:
-                grouped = group_spans(
-                    [{"span": o["span"], "change": "added"} for o in outages]
-                )
-
-                # Форматуємо часи компактно
-                time_ranges = []
-                for g in grouped:
-                    start = g["start"].lstrip("0") or "0:00"
-                    end = g["end"].lstrip("0") or "0:00"
-                    if start.startswith(":"):
-                        start = "0" + start
-                    if end.startswith(":"):
-                        end = "0" + end
-                    time_ranges.append(f"{start}-{end}")
-
-                times_str = ", ".join(time_ranges)
-                parts.append(f"Черга {queue_key}: \n🪫{times_str}")
-                parts.append("")  # Порожній рядок після КОЖНОЇ черги
+        # Черги з відключеннями на цю дату — прямо з індексу
+        by_queue = outage_index.get(date, {})
+        for queue_key in sorted(by_queue, key=queue_sort_key):
+            if queue_key not in queues_with_new_dates:
+                continue
+
+            # Форматуємо часи компактно
+            times_str = ", ".join(
+                f"{format_time(start)}-{format_time(end)}"
+                for start, end in by_queue[queue_key]
+            )
+            parts.append(f"Черга {queue_key}: \n🪫{times_str}")
+            parts.append("")  # Порожній рядок після КОЖНОЇ черги
 
         parts.append("")  # Додатковий відступ після всіх черг дати
 
     # Посилання
     parts.append(
-        f'<a href="{url}">🔗 Сайт "ЖОЕ"</a> | '
+        f'<a href="{url}">🔗 Сайт "{site_name}"</a> | '
         f'<a href="{subscribe}">⚡️ ПІДПИСАТИСЯ </a>'
     )
     if update_date_str:
@@ -498,156 +615,192 @@ def build_new_schedule_notification(
     return "\n".join(parts)
 
 
-def send_notification_safe(message: str, img_path=None) -> bool:
-    """Надсилає повідомлення з перевіркою лімітів Telegram"""
-    CAPTION_LIMIT = 1024  # Ліміт для caption з фото
-    TEXT_LIMIT = 4096     # Ліміт для звичайного text повідомлення
-    
-    msg_len = len(message)
-    log_to_buffer(f"📝 Довжина повідомлення: {msg_len} символів")
-    
-    # Якщо є фото і текст не влазить в caption
-    if img_path and msg_len > CAPTION_LIMIT:
-        log_to_buffer(f"⚠️ Текст {msg_len} > {CAPTION_LIMIT} (ліміт caption), надсилаю спочатку фото, потім текст")
-        # Спочатку надсилаємо фото без тексту
-        send_notification("📸", img_path)
-        # Потім надсилаємо текст окремим повідомленням
-        if msg_len > TEXT_LIMIT:
-            log_to_buffer(f"⚠️ Текст {msg_len} > {TEXT_LIMIT}, обрізаю")
-            message = message[:TEXT_LIMIT-100] + "\n\n... (текст скорочено)"
-        return send_notification(message, None)
-    
-    # Якщо немає фото, але текст завеликий для text повідомлення
-    if not img_path and msg_len > TEXT_LIMIT:
-        log_to_buffer(f"⚠️ Текст {msg_len} > {TEXT_LIMIT}, обрізаю")
-        message = message[:TEXT_LIMIT-100] + "\n\n... (текст скорочено)"
-    
-    return send_notification(message, img_path)
-
-
-def main():
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_to_buffer("=" * 60)
-    log_to_buffer(f"🚀 СТАРТ [{timestamp}]")
-    log_to_buffer("=" * 60)
-
-    try:
-        # 1. Завантажити графіки з API
-        current_schedules, has_error = fetch_all_schedules()
-        if not current_schedules:
-            log_to_buffer("❌ Не вдалось завантажити жоден графік")
-            return
-
-        # 2. Побудувати поточний стан
-        norm_by_queue, current_main_hashes, current_span_hashes = build_state(
-            current_schedules, has_error
-        )
-        log_to_buffer(f"🔐 Витягнено хеші для {len(current_main_hashes)} черг")
-
-        # 3. Зберегти поточні нормалізовані дані
-        if CURRENT_FILE.exists():
-            shutil.copy(CURRENT_FILE, PREVIOUS_FILE)
-            log_to_buffer("📋 Попередній current.json скопійовано в previous.json")
-        
-        save_json(norm_by_queue, CURRENT_FILE)
-        log_to_buffer("💾 Нормалізовані дані збережено в data/current.json")
-
-        # 4. Завантажити попередній стан
-        last_state = load_last_state()
-        log_to_buffer("📋 Завантажено попередній стан")
-
-        # 5. Побудувати diff
-        diff = build_diff(norm_by_queue, current_main_hashes, current_span_hashes, last_state)
-
-        if not diff["queues"] and not diff["new_dates"]:
-            log_to_buffer("✅ Дані по всіх чергах не змінилися")
-            save_state(current_main_hashes, current_span_hashes, timestamp)
-            return
-
-        log_to_buffer(f"🔔 Зміни виявлено для: {', '.join(diff['queues'])}")
-
-        # 6. Отримати дату оновлення з сайту
-        _, date_content = get_schedule_content()
-
-        # 7. Скріншот із сайту
-        screenshot_path, screenshot_hash = take_screenshot_between_elements()
-        if not screenshot_path:
-            log_to_buffer("⚠️ Не вдалося створити скріншот")
-
-        from pathlib import Path as _Path
-        img_path = _Path(screenshot_path) if screenshot_path else None
-
-        # 8. Визначаємо типи змін
-        has_new_dates = bool(diff.get("new_dates"))
-        has_changes = any(
-            q_info.get("changed_dates") 
-            for q_info in diff["per_queue"].values()
-        )
+def build_change_renderer(
+    provider: Dict,
+    diff: Dict,
+    norm_by_queue: Dict[str, List[Dict]],
+    summaries: Optional[Summaries] = None,
+    prev_summaries: Optional[Summaries] = None,
+):
+    """
+    Готує індекси змін і повертає render(дата оновлення) ->
+    (повідомлення про зміни, про новий графік) для delivery.deliver_changes.
+    """
+    url = provider.get("url") or ""
+    subscribe = provider.get("subscribe") or ""
+    site_name = provider.get("site_name") or "ЖОЕ"
+
+    # Визначаємо типи змін; індекси будуються один раз на запуск
+    has_new_dates = bool(diff.get("new_dates"))
+    has_changes = any(
+        q_info.get("changed_dates")
+        for q_info in diff["per_queue"].values()
+    )
+    changes_index = build_changes_index(diff)
+    outage_index = build_outage_index(
+        norm_by_queue, [q for q in diff["queues"] if diff["per_queue"][q]["new_dates"]]
+    )
 
-        # 9. Логіка відправки повідомлень з фото
-        
-        # Випадок 1: Є ТІЛЬКИ зміни (без нових дат)
-        # -> Надсилаємо повідомлення про зміни + фото
-        if has_changes and not has_new_dates:
-            log_to_buffer("📤 Надсилаю повідомлення про зміни + фото")
+    def render(date_content: str) -> Tuple[str, str]:
+        changes_msg = ""
+        new_msg = ""
+        if has_changes:
             changes_msg = build_changes_notification(
-                diff, URL, SUBSCRIBE, date_content or ""
+                diff, url, subscribe, date_content, site_name, changes_index,
+                summaries, prev_summaries,
             )
-            if changes_msg:
-                ok = send_notification_safe(changes_msg, img_path)
-                if ok:
-                    log_to_buffer("✅ Повідомлення про зміни відправлено")
-                else:
-                    log_to_buffer("❌ Помилка надсилання повідомлення про зміни")
-            else:
+            if not changes_msg:
                 log_to_buffer("⚠️ Немає черг зі змінами для відправки")
-        
-        # Випадок 2: Є ТІЛЬКИ новий графік (без змін)
-        # -> Надсилаємо повідомлення про новий графік + фото
-        elif has_new_dates and not has_changes:
-            log_to_buffer("📤 Надсилаю повідомлення про новий графік + фото")
+        if has_new_dates:
             new_msg = build_new_schedule_notification(
-                diff, norm_by_queue, URL, SUBSCRIBE, date_content or ""
+                diff, outage_index, url, subscribe, date_content, site_name
             )
-            if new_msg:
-                ok = send_notification_safe(new_msg, img_path)
-                if ok:
-                    log_to_buffer("✅ Повідомлення про новий графік відправлено")
-                else:
-                    log_to_buffer("❌ Помилка надсилання повідомлення про новий графік")
-            else:
+            if not new_msg:
                 log_to_buffer("⚠️ Немає черг з новими датами для відправки")
-        
-        # Випадок 3: Є І зміни, І новий графік
-        # -> Надсилаємо два повідомлення: 
-        #    1) зміни + фото
-        #    2) новий графік без фото
-        elif has_changes and has_new_dates:
-            log_to_buffer("📤 Надсилаю повідомлення про зміни + фото")
-            changes_msg = build_changes_notification(
-                diff, URL, SUBSCRIBE, date_content or ""
-            )
-            if changes_msg:
-                ok1 = send_notification_safe(changes_msg, img_path)
-                if ok1:
-                    log_to_buffer("✅ Повідомлення про зміни відправлено")
-                else:
-                    log_to_buffer("❌ Помилка надсилання повідомлення про зміни")
-            
-            log_to_buffer("📤 Надсилаю повідомлення про новий графік (без фото)")
-            new_msg = build_new_schedule_notification(
-                diff, norm_by_queue, URL, SUBSCRIBE, date_content or ""
-            )
-            if new_msg:
-                ok2 = send_notification_safe(new_msg, None)  # БЕЗ фото
-                if ok2:
-                    log_to_buffer("✅ Повідомлення про новий графік відправлено")
-                else:
-                    log_to_buffer("❌ Помилка надсилання повідомлення про новий графік")
+        return changes_msg, new_msg
 
-        # 10. Оновити тільки хеші
-        save_state(current_main_hashes, current_span_hashes, timestamp)
-        log_to_buffer("💾 Хеші оновлено в data/last_hash.json")
+    return render
+
+
+def process_reminders(
+    provider: Dict,
+    norm_by_queue: Dict[str, List[Dict]],
+    span_hashes: Dict[str, Dict[str, Dict[str, str]]],
+    last_state: Dict,
+) -> None:
+    """Оновлює план нагадувань за зміненими хешами і надсилає ті, час яких настав."""
+    lead = provider.get("reminder_minutes") or 0
+    if lead <= 0:
+        return
+
+    data_dir: Path = provider["data_dir"]
+    now_minute = datetime_to_minute(local_now())
+
+    scheduler = load_scheduler(data_dir, lead)
+    if scheduler is None:
+        scheduler = ReminderScheduler(lead)
+        added = scheduler.schedule_all(norm_by_queue, now_minute)
+        log_to_buffer(f"⏰ План нагадувань побудовано заново: {added} подій")
+    else:
+        added = scheduler.apply_diff(
+            norm_by_queue, span_hashes, last_state.get("span_hashes", {}), now_minute
+        )
+        if added:
+            log_to_buffer(f"⏰ Переплановано подій: {added}")
+
+    due = scheduler.pop_due(now_minute)
+    if due:
+        # Telegram і asyncio — лише коли нагадування справді треба слати
+        from delivery import send_to_channels
+
+        message = build_reminder_notification(due, lead)
+        ok = send_to_channels(message, None, provider.get("channels") or [])
+        if ok:
+            log_to_buffer(f"✅ Нагадування відправлено ({len(due)} черг)")
+        else:
+            log_to_buffer("❌ Помилка надсилання нагадування")
+
+    save_scheduler(scheduler, data_dir)
+
+
+def run_provider(provider: Dict, timestamp: str) -> None:
+    """Повний цикл fetch → state → diff → повідомлення для одного провайдера."""
+
+    data_dir: Path = provider["data_dir"]
+    current_file = data_dir / CURRENT_FILE.name
+    previous_file = data_dir / PREVIOUS_FILE.name
+
+    log_to_buffer(f"🏢 Провайдер: {provider['id']}")
+
+    # 1. Завантажити графіки з API
+    current_schedules, has_error = fetch_all_schedules(
+        provider["queues"], provider.get("api_base_url")
+    )
+    if not current_schedules:
+        log_to_buffer("❌ Не вдалось завантажити жоден графік")
+        return
+
+    # 2. Побудувати поточний стан
+    norm_by_queue, current_main_hashes, current_span_hashes = build_state(
+        current_schedules, has_error
+    )
+    log_to_buffer(f"🔐 Витягнено хеші для {len(current_main_hashes)} черг")
+
+    # 3. Зберегти поточні нормалізовані дані
+    if current_file.exists():
+        shutil.copy(current_file, previous_file)
+        log_to_buffer(f"📋 Попередній {current_file} скопійовано в {previous_file.name}")
+
+    save_json(norm_by_queue, current_file)
+    log_to_buffer(f"💾 Нормалізовані дані збережено в {current_file}")
+
+    # 4. Завантажити попередній стан
+    last_state = load_last_state(data_dir)
+    log_to_buffer("📋 Завантажено попередній стан")
+
+    # 5. Побудувати diff
+    diff = build_diff(norm_by_queue, current_main_hashes, current_span_hashes, last_state)
+
+    # 5a. Денні підсумки: перераховуються лише дати, змінені за diff
+    summaries = update_summaries(
+        last_state["summaries"], norm_by_queue, current_span_hashes, diff
+    )
+
+    # 5b. Нагадування про найближчі відключення (і без змін у графіку)
+    process_reminders(provider, norm_by_queue, current_span_hashes, last_state)
+
+    if not diff["queues"] and not diff["new_dates"]:
+        log_to_buffer("✅ Дані по всіх чергах не змінилися")
+        save_state(current_main_hashes, current_span_hashes, timestamp, data_dir, summaries)
+        return
+
+    log_to_buffer(f"🔔 Зміни виявлено для: {', '.join(diff['queues'])}")
+
+    # 6-9. Захоплення сайту, рендеринг і доставка — конвеєром.
+    # asyncio, браузер і Telegram вантажаться лише коли є зміни
+    from delivery import deliver
+
+    render = build_change_renderer(
+        provider, diff, norm_by_queue, summaries, last_state["summaries"]
+    )
+    deliver(provider, render)
+
+    # 10. Оновити хеші й підсумки
+    save_state(current_main_hashes, current_span_hashes, timestamp, data_dir, summaries)
+    log_to_buffer(f"💾 Хеші оновлено в {data_dir / HASH_FILE.name}")
+
+
+def main(profile: bool = False, profile_top: int = 10):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_to_buffer("=" * 60)
+    log_to_buffer(f"🚀 СТАРТ [{timestamp}]")
+    log_to_buffer("=" * 60)
+
+    try:
+        if profile:
+            # cProfile/tracemalloc потрібні лише в режимі профілювання
+            from profiling import profile_run
+            profiler = profile_run(DATA_DIR, profile_top)
+        else:
+            profiler = nullcontext()
+
+        with profiler:
+            providers = load_providers()
+            log_to_buffer(f"🗂 Провайдерів у реєстрі: {len(providers)}")
+
+            for provider in providers:
+                # Помилка одного провайдера не зупиняє решту
+                try:
+                    with state_lock(provider["data_dir"]) as acquired:
+                        if not acquired:
+                            log_to_buffer(
+                                f"⏳ {provider['data_dir']} зайнятий іншим запуском, "
+                                f"пропускаю {provider['id']}"
+                            )
+                            continue
+                        run_provider(provider, timestamp)
+                except Exception as e:
+                    log_to_buffer(f"❌ Критична помилка [{provider['id']}]: {e}")
 
     except Exception as e:
         log_to_buffer(f"❌ Критична помилка: {e}")
@@ -657,4 +810,14 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    # argparse потрібен лише при запуску як скрипта
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Моніторинг графіків відключень")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="профілювати запуск (cProfile + tracemalloc), артефакти — в data/",
+    )
+    parser.add_argument("--profile-top", type=int, default=10, help="скільки функцій у підсумку")
+    args = parser.parse_args()
+    main(profile=args.profile, profile_top=args.profile_top)
@@ -0,0 +1,144 @@
+"""
+Легка перевірка "чи є робота" — лише стандартна бібліотека.
+
+Тягне всі черги, рахує ті самі головні хеші, що й build_state,
+і порівнює з data/last_hash.json. Результат — JSON-рядок у stdout
+і код виходу:
+    0  — змін немає (unchanged)
+    10 — є зміни або настає час нагадування, потрібен повний запуск monitor.py (changed)
+    20 — помилка API/конфігу (error)
+"""
+import json
+import os
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from providers import load_providers
+from reminders import load_scheduler
+from schedule_core import (
+    FETCH_WORKERS,
+    HASH_FILE_NAME,
+    RESPONSE_CHUNK_SIZE,
+    datetime_to_minute,
+    iter_schedule_records,
+    local_now,
+    queue_main_hash,
+)
+
+EXIT_UNCHANGED = 0
+EXIT_CHANGED = 10
+EXIT_ERROR = 20
+
+# Горизонт нагадувань: інтервал між запусками cron (хв)
+PROBE_WINDOW_MINUTES = int(os.getenv("PROBE_WINDOW_MINUTES", "5"))
+
+
+def fetch_queue_hash(
+    api_base_url: str, cherga_id: int, pidcherga_id: int
+) -> Tuple[Optional[str], Optional[str]]:
+    """Повертає (головний хеш, помилка) для однієї черги."""
+    params = urllib.parse.urlencode({"cherga_id": cherga_id, "pidcherga_id": pidcherga_id})
+    sep = "&" if "?" in api_base_url else "?"
+    try:
+        with urllib.request.urlopen(f"{api_base_url}{sep}{params}", timeout=10) as resp:
+            # Той самий потоковий розбір, що й у fetch_schedule
+            chunks = iter(lambda: resp.read(RESPONSE_CHUNK_SIZE), b"")
+            norm_list = list(iter_schedule_records(chunks, cherga_id, pidcherga_id))
+    except Exception as e:
+        return None, str(e)
+
+    norm_list.sort(key=lambda r: (r["date"], r["span"]))
+    return queue_main_hash(norm_list), None
+
+
+def load_main_hashes(data_dir: Path) -> Dict[str, str]:
+    try:
+        with open(data_dir / HASH_FILE_NAME, "r", encoding="utf-8") as f:
+            return json.load(f).get("main_hashes", {})
+    except Exception:
+        return {}
+
+
+def reminders_due(provider: Dict) -> bool:
+    """Чи настане нагадування до наступного запуску (або план ще не побудовано)."""
+    lead = provider.get("reminder_minutes") or 0
+    if lead <= 0:
+        return False
+    scheduler = load_scheduler(provider["data_dir"], lead)
+    if scheduler is None:
+        return True
+    fire_at = scheduler.next_fire_at()
+    now_minute = datetime_to_minute(local_now())
+    return fire_at is not None and fire_at < now_minute + PROBE_WINDOW_MINUTES
+
+
+def probe_provider(provider: Dict) -> Dict:
+    """Статус одного провайдера: changed / unchanged / error."""
+    api_base_url = provider.get("api_base_url")
+    if not api_base_url:
+        return {
+            "status": "error", "changed": [], "errors": ["api_base_url не задано"], "reminders_due": False,
+        }
+
+    queues: List[Tuple[int, int]] = provider["queues"]
+    last_main = load_main_hashes(provider["data_dir"])
+
+    with ThreadPoolExecutor(max_workers=max(FETCH_WORKERS, 1)) as pool:
+        results = list(pool.map(lambda q: fetch_queue_hash(api_base_url, *q), queues))
+
+    changed: List[str] = []
+    errors: List[str] = []
+    for (cherga_id, pidcherga_id), (main_hash, error) in zip(queues, results):
+        queue_key = f"{cherga_id}.{pidcherga_id}"
+        if error is not None:
+            errors.append(f"{queue_key}: {error}")
+        elif last_main.get(queue_key) != main_hash:
+            # Нова черга без хешу теж потребує повного запуску, щоб його записати
+            changed.append(queue_key)
+
+    due = reminders_due(provider)
+    if changed or due:
+        status = "changed"
+    elif errors:
+        status = "error"
+    else:
+        status = "unchanged"
+    return {"status": status, "changed": changed, "errors": errors, "reminders_due": due}
+
+
+def main() -> int:
+    started = time.perf_counter()
+    report: Dict = {"status": "unchanged", "providers": {}}
+
+    try:
+        providers = load_providers()
+    except Exception as e:
+        report["status"] = "error"
+        report["error"] = f"Не вдалося прочитати реєстр провайдерів: {e}"
+        providers = []
+
+    for provider in providers:
+        result = probe_provider(provider)
+        report["providers"][provider["id"]] = result
+        # changed важливіше за error: повний запуск однаково потрібен
+        if result["status"] == "changed":
+            report["status"] = "changed"
+        elif result["status"] == "error" and report["status"] == "unchanged":
+            report["status"] = "error"
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(json.dumps(report, ensure_ascii=False))
+
+    return {
+        "unchanged": EXIT_UNCHANGED,
+        "changed": EXIT_CHANGED,
+    }.get(report["status"], EXIT_ERROR)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import cProfile
+import pstats
+import sysconfig
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from typing import List
+from log_utils import log_to_buffer
+
+PROFILE_STATS_NAME = "profile.prof"
+PROFILE_REPORT_NAME = "profile.txt"
+# Модулі проєкту — для розбивки часу по етапах (API / сайт / Telegram)
+PROJECT_ROOT = str(Path(__file__).resolve().parent)
+STDLIB_ROOT = sysconfig.get_paths()["stdlib"]
+# Період семплювання фонових потоків
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_MS", "5")) / 1000
+
+
+def _func_label(func) -> str:
+    filename, line, name = func
+    return f"{Path(filename).name}:{line}({name})" if line else name
+
+
+def hot_functions(stats: pstats.Stats, top_n: int) -> List[str]:
+    """Короткий підсумок: етапи проєкту за cumulative і найгарячіші функції за self-часом."""
+    rows = stats.stats  # func -> (cc, nc, tottime, cumtime, callers)
+
+    stages = sorted(
+        (func for func in rows if func[0].startswith(PROJECT_ROOT)),
+        key=lambda f: rows[f][3],
+        reverse=True,
+    )[:top_n]
+    hottest = sorted(rows, key=lambda f: rows[f][2], reverse=True)[:top_n]
+
+    lines = ["🔥 Етапи (cumulative):"]
+    lines += [f"  {rows[f][3] * 1000:8.1f} ms  {_func_label(f)}" for f in stages]
+    lines.append("🔥 Гарячі функції (self):")
+    lines += [
+        f"  {rows[f][2] * 1000:8.1f} ms  {rows[f][1]:>7} викл.  {_func_label(f)}"
+        for f in hottest
+    ]
+    return lines
+
+
+def _package(filename: str) -> str:
+    """Пакет, якому належить файл: bs4, PIL, playwright, stdlib/ssl, monitor.py ..."""
+    parts = Path(filename).parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            i = parts.index(marker)
+            if i + 1 < len(parts):
+                return Path(parts[i + 1]).stem
+    if filename.startswith(PROJECT_ROOT):
+        return Path(filename).name
+    if filename.startswith(STDLIB_ROOT):
+        return f"stdlib/{Path(filename).stem}"
+    return Path(filename).name
+
+
+def _is_plumbing(code) -> bool:
+    """Кадри запуску потоку і пулу — є в кожному стеку, тож нічого не кажуть."""
+    filename = code.co_filename.replace("\\", "/")
+    return filename.endswith(("/threading.py", "/concurrent/futures/thread.py"))
+
+
+def _is_idle(code) -> bool:
+    """Потік чекає на блокування або простоює в пулі без задачі."""
+    return _is_plumbing(code) and code.co_name != "run"
+
+
+class ThreadSampler(threading.Thread):
+    """
+    Семплювальний профайлер фонових потоків (fetch-пул, asyncio.to_thread):
+    кожні SAMPLE_INTERVAL с знімає стеки через sys._current_frames().
+    Головний потік не семплюється — його бачить cProfile.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.busy = 0.0
+        # Вага семпла — реальний час від попереднього знімка: під GIL
+        # семплер прокидається рідше за interval
+        self.by_package: Counter = Counter()   # пакет верхнього кадру -> секунди
+        self.by_function: Counter = Counter()  # функція в стеку -> секунди (cumulative)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        skip = {threading.get_ident(), threading.main_thread().ident}
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident not in skip:
+                    self._record(frame, weight)
+
+    def _record(self, frame, weight: float) -> None:
+        if _is_idle(frame.f_code):
+            return
+        self.samples += 1
+        self.busy += weight
+        self.by_package[_package(frame.f_code.co_filename)] += weight
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            func = (code.co_filename, code.co_firstlineno, code.co_name)
+            if func not in seen and not _is_plumbing(code):
+                seen.add(func)
+                self.by_function[func] += weight
+            frame = frame.f_back
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def summary(self, top_n: int) -> List[str]:
+        if not self.samples:
+            return ["🧵 Фонові потоки: активних семплів немає"]
+        lines = [
+            f"🧵 Фонові потоки ({self.samples} семплів, крок {self.interval * 1000:.0f} мс), за пакетами:"
+        ]
+        lines += [
+            f"  {seconds * 1000:8.1f} ms  {seconds / self.busy:4.0%}  {package}"
+            for package, seconds in self.by_package.most_common(top_n)
+        ]
+        lines.append("🧵 Фонові потоки, функції (cumulative):")
+        lines += [
+            f"  {seconds * 1000:8.1f} ms  {_func_label(func)}"
+            for func, seconds in self.by_function.most_common(top_n)
+        ]
+        return lines
+
+
+@contextmanager
+def profile_run(out_dir: Path, top_n: int = 10):
+    """
+    Профілює запуск: cProfile + пікова пам'ять (tracemalloc).
+    Артефакти пишуться в out_dir (profile.prof для snakeviz/pstats і
+    profile.txt), а короткий top-N додається в лог, що піде в канал.
+    cProfile бачить лише головний потік, тож фонові потоки (fetch,
+    BeautifulSoup і Pillow в asyncio.to_thread) окремо семплює ThreadSampler.
+    """
+    tracemalloc.start()
+    sampler = ThreadSampler()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(out_dir / PROFILE_STATS_NAME))
+
+        report = StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        summary = [
+            f"⏱ Профіль: {elapsed:.2f} с, пік пам'яті {peak / 1024 / 1024:.1f} MiB",
+            *hot_functions(stats, top_n),
+            *sampler.summary(top_n),
+        ]
+        stats.sort_stats("cumulative").print_stats(50)
+        with open(out_dir / PROFILE_REPORT_NAME, "w", encoding="utf-8") as f:
+            f.write("\n".join(summary) + "\n\n" + report.getvalue())
+
+        for line in summary:
+            log_to_buffer(line)
+        log_to_buffer(f"💾 Профіль збережено в {out_dir / PROFILE_STATS_NAME}")
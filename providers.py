@@ -0,0 +1,143 @@
+import os
+import re
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROVIDERS_FILE = Path(os.getenv("PROVIDERS_FILE", "providers.json"))
+DATA_DIR = Path("data")
+# За скільки хвилин до відключення нагадувати; 0 — нагадування вимкнені
+# (порожнє значення — як не задано: так його передає workflow без змінної)
+REMINDER_MINUTES = int(os.getenv("REMINDER_MINUTES") or "0")
+
+DEFAULT_QUEUES: List[Tuple[int, int]] = [
+    (i, j) for i in range(1, 7) for j in range(1, 2 + 1)
+]
+# Змінна, яку expandvars лишив як є, бо її немає в оточенні
+_UNRESOLVED_RE = re.compile(r"\$(\w+|\{[^}]*\})")
+
+
+def _expand(value):
+    """
+    Підставляє змінні оточення (${VAR}) у рядкові значення конфігу.
+    Значення з незаданою змінною вважається відсутнім (None),
+    а не літералом "${VAR}".
+    """
+    if isinstance(value, str):
+        value = os.path.expandvars(value)
+        if _UNRESOLVED_RE.search(value):
+            return None
+    return value
+
+
+def _require_api(provider: Dict) -> Dict:
+    if not provider["api_base_url"]:
+        raise ValueError(
+            f"Провайдер {provider['id']}: api_base_url не задано "
+            f"(перевірте змінні оточення)"
+        )
+    return provider
+
+
+def _require_channels(provider_id: str, channels: List) -> List[str]:
+    """
+    Канали провайдера з реєстру обов'язкові: порожній список означав би
+    канал за замовчуванням, тобто чужий канал (ЖОЕ).
+    """
+    if not channels or not all(channels):
+        raise ValueError(
+            f"Провайдер {provider_id}: channels не задано або змінна не підставлена "
+            f"(перевірте змінні оточення)"
+        )
+    return channels
+
+
+def parse_queues(spec) -> List[Tuple[int, int]]:
+    """
+    Розбирає опис черг з конфігу.
+    Підтримує список рядків ["1.1", "1.2"], список пар [[1, 1], [1, 2]]
+    або діапазони {"cherga": [1, 6], "pidcherga": [1, 2]} (включно).
+    """
+    if not spec:
+        return list(DEFAULT_QUEUES)
+
+    if isinstance(spec, dict):
+        c_from, c_to = spec["cherga"]
+        p_from, p_to = spec["pidcherga"]
+        return [
+            (i, j)
+            for i in range(int(c_from), int(c_to) + 1)
+            for j in range(int(p_from), int(p_to) + 1)
+        ]
+
+    queues: List[Tuple[int, int]] = []
+    seen = set()
+    for item in spec:
+        if isinstance(item, str):
+            cherga_id, pidcherga_id = map(int, item.split("."))
+        else:
+            cherga_id, pidcherga_id = map(int, item)
+        if (cherga_id, pidcherga_id) in seen:
+            continue
+        seen.add((cherga_id, pidcherga_id))
+        queues.append((cherga_id, pidcherga_id))
+    return queues
+
+
+def default_provider() -> Dict:
+    """Один провайдер з env — поведінка до появи providers.json."""
+    channel = os.getenv("TELEGRAM_CHANNEL_ID")
+    return {
+        "id": "default",
+        "site_name": "ЖОЕ",
+        "api_base_url": os.getenv("API_BASE_URL"),
+        "url": os.getenv("URL"),
+        "subscribe": os.getenv("SUBSCRIBE"),
+        "queues": list(DEFAULT_QUEUES),
+        "channels": [channel] if channel else [],
+        # Стан лишається в корені data/, щоб не загубити історію
+        "data_dir": DATA_DIR,
+        "screenshot_path": "screenshot.png",
+        "reminder_minutes": REMINDER_MINUTES,
+    }
+
+
+def load_providers(path: Path = PROVIDERS_FILE) -> List[Dict]:
+    """
+    Завантажує реєстр провайдерів з JSON-файлу.
+    Якщо файлу немає — повертає одного провайдера з env.
+    ValueError — якщо в якогось провайдера немає api_base_url або каналів.
+    """
+    if not path.exists():
+        return [_require_api(default_provider())]
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    entries = config.get("providers", []) if isinstance(config, dict) else config
+    providers: List[Dict] = []
+    seen_ids = set()
+
+    for entry in entries:
+        provider_id = str(entry["id"])
+        if provider_id in seen_ids:
+            raise ValueError(f"Дубльований id провайдера: {provider_id}")
+        seen_ids.add(provider_id)
+
+        channels = _require_channels(
+            provider_id, [_expand(c) for c in entry.get("channels", [])]
+        )
+        providers.append(_require_api({
+            "id": provider_id,
+            "site_name": entry.get("site_name", provider_id),
+            "api_base_url": _expand(entry.get("api_base_url")),
+            "url": _expand(entry.get("url")),
+            "subscribe": _expand(entry.get("subscribe")),
+            "queues": parse_queues(entry.get("queues")),
+            "channels": channels,
+            "data_dir": DATA_DIR / provider_id,
+            "screenshot_path": f"screenshot_{provider_id}.png",
+            "reminder_minutes": int(entry.get("reminder_minutes", REMINDER_MINUTES)),
+        }))
+
+    return providers
@@ -0,0 +1,279 @@
+"""
+Локальний сервіс запитів "чи є зараз світло?" — лише стандартна бібліотека.
+
+Завантажує нормалізований стан (data/current.json) в інтервальний індекс
+по чергах і відповідає на запити за O(log n):
+    GET /status?queue=2.1[&at=2026-01-18T13:00]   — чи є відключення в момент T
+    GET /next?queue=2.1[&at=...]                  — найближче (або поточне) відключення
+    GET /minutes?queue=2.1[&date=2026-01-18]      — хвилин без світла за добу
+    GET /queues                                   — список черг
+Файл стану перечитується автоматично, коли monitor.py записує новий.
+
+Запуск: python query_server.py [--state data/current.json] [--port 8080]
+Бенчмарк: python query_server.py --bench 100000
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from schedule_core import (
+    MINUTES_PER_DAY,
+    datetime_to_minute,
+    day_minute,
+    local_now,
+    minute_to_datetime,
+    outage_intervals,
+    parse_date,
+    queue_sort_key,
+)
+
+STATE_FILE = Path("data") / "current.json"
+# Як часто (с) перевіряти mtime файлу стану
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+class QueueIntervals:
+    """Відсортовані неперетинні інтервали відключень однієї черги."""
+
+    __slots__ = ("starts", "ends", "prefix")
+
+    def __init__(self, intervals: List[Tuple[int, int]]):
+        self.starts = [s for s, _ in intervals]
+        self.ends = [e for _, e in intervals]
+        # prefix[i] — сума тривалостей перших i інтервалів
+        self.prefix = [0] + list(accumulate(e - s for s, e in intervals))
+
+    def status(self, t: int) -> Optional[Tuple[int, int]]:
+        """Інтервал відключення, що містить t, або None."""
+        i = bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def next_outage(self, t: int) -> Optional[Tuple[int, int]]:
+        """Поточне відключення або перше, що починається після t."""
+        i = bisect_right(self.ends, t)
+        if i < len(self.starts):
+            return self.starts[i], self.ends[i]
+        return None
+
+    def minutes_between(self, lo: int, hi: int) -> int:
+        """Сумарна тривалість відключень у [lo, hi)."""
+        first = bisect_right(self.ends, lo)
+        last = bisect_left(self.starts, hi)
+        if first >= last:
+            return 0
+        total = self.prefix[last] - self.prefix[first]
+        # Обрізаємо крайні інтервали по межах вікна
+        total -= max(0, lo - self.starts[first])
+        total -= max(0, self.ends[last - 1] - hi)
+        return total
+
+
+class IntervalIndex:
+    """Індекс черга -> QueueIntervals, побудований з norm_by_queue."""
+
+    def __init__(self, norm_by_queue: Dict[str, List[Dict]]):
+        self.queues: Dict[str, QueueIntervals] = {
+            queue_key: QueueIntervals(outage_intervals(records))
+            for queue_key, records in norm_by_queue.items()
+        }
+
+    def get(self, queue_key: str) -> Optional[QueueIntervals]:
+        return self.queues.get(queue_key)
+
+
+class StateStore:
+    """
+    Тримає актуальний IntervalIndex і перечитує файл, коли той змінився.
+    monitor.py пише стан через os.replace, тож файл завжди цілісний;
+    новий індекс будується збоку й підміняється одним присвоєнням.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index = IntervalIndex({})
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            norm_by_queue = json.load(f)
+        self.index = IntervalIndex(norm_by_queue)
+        self._signature = signature
+        return True
+
+    def current(self) -> IntervalIndex:
+        now = time.monotonic()
+        if now - self._checked_at >= RELOAD_CHECK_INTERVAL:
+            # Перевіряє лише один потік; решта віддають поточний індекс
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._checked_at = now
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Не вдалося перечитати {self.path}: {e}")
+                finally:
+                    self._lock.release()
+        return self.index
+
+
+def parse_at(value: Optional[str]) -> int:
+    """ISO-час у місцевому часі (2026-01-18T13:00) -> хвилина на шкалі."""
+    if not value:
+        return datetime_to_minute(local_now())
+    return datetime_to_minute(datetime.fromisoformat(value))
+
+
+def format_minute(minute: int) -> str:
+    return minute_to_datetime(minute).isoformat(timespec="minutes")
+
+
+def interval_json(interval: Optional[Tuple[int, int]]) -> Optional[Dict]:
+    if interval is None:
+        return None
+    start, end = interval
+    return {"start": format_minute(start), "end": format_minute(end), "minutes": end - start}
+
+
+def handle_query(index: IntervalIndex, path: str, query: Dict[str, str]) -> Tuple[int, Dict]:
+    """Обробка запиту без HTTP-обв'язки (використовується і бенчмарком)."""
+    if path == "/queues":
+        return 200, {"queues": sorted(index.queues, key=queue_sort_key)}
+
+    queue_key = query.get("queue", "")
+    intervals = index.get(queue_key)
+    if intervals is None:
+        return 404, {"error": f"Невідома черга: {queue_key}"}
+
+    if path == "/status":
+        t = parse_at(query.get("at"))
+        current = intervals.status(t)
+        return 200, {
+            "queue": queue_key,
+            "at": format_minute(t),
+            "power_off": current is not None,
+            "outage": interval_json(current),
+        }
+
+    if path == "/next":
+        t = parse_at(query.get("at"))
+        return 200, {
+            "queue": queue_key,
+            "at": format_minute(t),
+            "next": interval_json(intervals.next_outage(t)),
+        }
+
+    if path == "/minutes":
+        day = parse_date(query["date"]) if query.get("date") else local_now().date()
+        if day is None:
+            return 400, {"error": f"Некоректна дата: {query['date']}"}
+        start = day_minute(day)
+        return 200, {
+            "queue": queue_key,
+            "date": day.isoformat(),
+            "minutes": intervals.minutes_between(start, start + MINUTES_PER_DAY),
+        }
+
+    return 404, {"error": f"Невідомий шлях: {path}"}
+
+
+def make_handler(store: StateStore):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                code, body = handle_query(store.current(), url.path, query)
+            except ValueError as e:
+                code, body = 400, {"error": str(e)}
+
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+def run_benchmark(store: StateStore, n: int) -> None:
+    """Запити без HTTP: міряє швидкість самого індексу."""
+    index = store.current()
+    queues = list(index.queues)
+    if not queues:
+        print(f"❌ Порожній стан: {store.path}")
+        return
+
+    all_starts = [s for q in index.queues.values() for s in q.starts]
+    base = min(all_starts) if all_starts else datetime_to_minute(local_now())
+    rnd = random.Random(42)
+    samples = [(rnd.choice(queues), base + rnd.randrange(2 * MINUTES_PER_DAY)) for _ in range(n)]
+
+    for name, query in (
+        ("status", lambda iv, t: iv.status(t)),
+        ("next", lambda iv, t: iv.next_outage(t)),
+        ("minutes", lambda iv, t: iv.minutes_between(t - t % MINUTES_PER_DAY, t - t % MINUTES_PER_DAY + MINUTES_PER_DAY)),
+    ):
+        started = time.perf_counter()
+        for queue_key, t in samples:
+            query(index.queues[queue_key], t)
+        elapsed = time.perf_counter() - started
+        print(f"{name:8s} {n / elapsed:12,.0f} запитів/с  ({elapsed / n * 1e6:.2f} мкс/запит)")
+
+    started = time.perf_counter()
+    for queue_key, t in samples:
+        handle_query(index, "/status", {"queue": queue_key, "at": format_minute(t)})
+    elapsed = time.perf_counter() - started
+    print(f"{'handler':8s} {n / elapsed:12,.0f} запитів/с  (з розбором і JSON-відповіддю)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальний сервіс запитів по графіку відключень")
+    parser.add_argument("--state", type=Path, default=STATE_FILE)
+    parser.add_argument("--host", default=os.getenv("QUERY_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("QUERY_PORT", "8080")))
+    parser.add_argument("--bench", type=int, metavar="N", help="виміряти запити/с на N запитах і вийти")
+    args = parser.parse_args()
+
+    store = StateStore(args.state)
+    if args.bench:
+        run_benchmark(store, args.bench)
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"🔌 Слухаю http://{args.host}:{args.port} (стан: {args.state}, черг: {len(store.index.queues)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
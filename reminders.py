@@ -0,0 +1,235 @@
+"""
+Нагадування "через N хв відключення" для черг.
+
+Події (початок/кінець відключення) виводяться з norm_by_queue і лежать
+у купі (heapq), впорядкованій за часом нагадування. Скасування ліниве:
+кожна пара (черга, дата) має лічильник поколінь, і застарілі записи
+просто пропускаються при видобуванні. Перепланування зачіпає лише
+дати, хеші інтервалів яких змінились (зокрема зниклі дати).
+
+Стан зберігається в data/<провайдер>/reminders.json між запусками.
+Модуль використовує лише стандартну бібліотеку (його читає probe.py).
+"""
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from schedule_core import (
+    MINUTES_PER_DAY,
+    minute_to_datetime,
+    outage_intervals,
+    parse_date,
+    queue_sort_key,
+    save_json,
+)
+
+REMINDERS_FILE_NAME = "reminders.json"
+
+# Запис купи: [fire_at, start, end, queue_key, date, gen]
+Entry = List
+
+
+class ReminderScheduler:
+    """Пріоритетна черга майбутніх нагадувань з лінивим скасуванням."""
+
+    def __init__(self, lead_minutes: int):
+        self.lead_minutes = lead_minutes
+        self.heap: List[Entry] = []
+        self.gens: Dict[str, int] = {}   # "черга|дата" -> покоління
+        self.live: Dict[str, int] = {}   # "черга|дата" -> живих подій у купі
+        self.queues: set = set()         # черги, для яких уже є план
+        self.stale = 0
+
+    @staticmethod
+    def _key(queue_key: str, date: str) -> str:
+        return f"{queue_key}|{date}"
+
+    def _is_live(self, entry: Entry) -> bool:
+        return self.gens.get(self._key(entry[3], entry[4]), 0) == entry[5]
+
+    def _cancel(self, key: str) -> None:
+        """Інвалідує всі події ключа одним інкрементом покоління — O(1)."""
+        self.stale += self.live.pop(key, 0)
+        self.gens[key] = self.gens.get(key, 0) + 1
+
+    def reschedule(
+        self,
+        queue_key: str,
+        records: List[Dict],
+        dates: Iterable[str],
+        now_minute: int,
+    ) -> int:
+        """
+        Скасовує і заново планує події черги для вказаних дат.
+        Повертає кількість нових подій.
+        """
+        dates = set(dates)
+        if not dates:
+            return 0
+
+        # Дата події — рядок як у записах, щоб ключі збігались із diff
+        date_by_day: Dict[int, str] = {}
+        for rec in records:
+            day = parse_date(rec.get("date", ""))
+            if day is not None:
+                date_by_day.setdefault(day.toordinal(), rec["date"])
+
+        # Відключення через північ зливається з попереднім днем і
+        # записується на нього, тож перераховуємо обидві сусідні дати:
+        # попередню (до неї могло приєднатися) і наступну (її подія
+        # могла злитися з цією датою або, навпаки, відокремитися)
+        for d in list(dates):
+            day = parse_date(d)
+            if day is None:
+                continue
+            for neighbour in (day.toordinal() - 1, day.toordinal() + 1):
+                if neighbour in date_by_day:
+                    dates.add(date_by_day[neighbour])
+
+        for d in dates:
+            self._cancel(self._key(queue_key, d))
+
+        added = 0
+        for start, end in outage_intervals(records):
+            date = date_by_day.get(start // MINUTES_PER_DAY)
+            if date not in dates or start <= now_minute:
+                continue
+            key = self._key(queue_key, date)
+            heapq.heappush(
+                self.heap,
+                [start - self.lead_minutes, start, end, queue_key, date, self.gens[key]],
+            )
+            self.live[key] = self.live.get(key, 0) + 1
+            added += 1
+
+        self.queues.add(queue_key)
+        self._compact()
+        return added
+
+    def schedule_all(self, norm_by_queue: Dict[str, List[Dict]], now_minute: int) -> int:
+        """Повне планування — коли збереженого стану ще немає."""
+        added = 0
+        for queue_key, records in norm_by_queue.items():
+            dates = {r["date"] for r in records}
+            added += self.reschedule(queue_key, records, dates, now_minute)
+        return added
+
+    def apply_diff(
+        self,
+        norm_by_queue: Dict[str, List[Dict]],
+        span_hashes: Dict[str, Dict[str, Dict[str, str]]],
+        last_span_hashes: Dict[str, Dict[str, Dict[str, str]]],
+        now_minute: int,
+    ) -> int:
+        """
+        Перепланування дат, чиї хеші інтервалів змінились. Порівнюються
+        самі хеші, а не build_diff: той не бачить зниклих дат і записів,
+        а події для них треба скасувати.
+        """
+        added = 0
+        for queue_key in set(span_hashes) | set(last_span_hashes):
+            cur_sh = span_hashes.get(queue_key, {})
+            old_sh = last_span_hashes.get(queue_key, {})
+            if cur_sh == old_sh:
+                continue
+            # Зниклі дати теж потрапляють сюди: reschedule лише скасує їх події
+            dates = {d for d in cur_sh.keys() | old_sh.keys() if cur_sh.get(d) != old_sh.get(d)}
+            added += self.reschedule(queue_key, norm_by_queue.get(queue_key, []), dates, now_minute)
+
+        # Черги, яких build_diff не бачив (перший запуск) — плануємо повністю
+        for queue_key, records in norm_by_queue.items():
+            if queue_key not in self.queues:
+                added += self.reschedule(queue_key, records, {r["date"] for r in records}, now_minute)
+        return added
+
+    def next_fire_at(self) -> Optional[int]:
+        """Час найближчого живого нагадування (хвилина на шкалі)."""
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+            self.stale -= 1
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now_minute: int) -> List[Dict]:
+        """
+        Видобуває нагадування, час яких настав.
+        Відключення, що вже почались (пропущений запуск), не нагадуються.
+        """
+        due: List[Dict] = []
+        while self.heap and self.heap[0][0] <= now_minute:
+            entry = heapq.heappop(self.heap)
+            if not self._is_live(entry):
+                self.stale -= 1
+                continue
+            fire_at, start, end, queue_key, date, _ = entry
+            self.live[self._key(queue_key, date)] -= 1
+            if start <= now_minute:
+                continue
+            due.append({"queue": queue_key, "date": date, "start": start, "end": end})
+        return due
+
+    def _compact(self) -> None:
+        """Прибирає застарілі записи, коли їх більше половини купи."""
+        if self.stale * 2 > len(self.heap):
+            self.heap = [e for e in self.heap if self._is_live(e)]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def to_json(self) -> Dict:
+        # Зберігаємо лише живі події; покоління без подій більше не потрібні,
+        # тож файл не росте з кожною минулою датою
+        heap = [e for e in self.heap if self._is_live(e)]
+        heapq.heapify(heap)
+        live_keys = {self._key(e[3], e[4]) for e in heap}
+        return {
+            "lead_minutes": self.lead_minutes,
+            "queues": sorted(self.queues),
+            "gens": {k: v for k, v in self.gens.items() if k in live_keys},
+            "heap": heap,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict, lead_minutes: int) -> Optional["ReminderScheduler"]:
+        """None — якщо стану немає або змінився lead (треба повне планування)."""
+        if not data or data.get("lead_minutes") != lead_minutes:
+            return None
+        scheduler = cls(lead_minutes)
+        scheduler.queues = set(data.get("queues", []))
+        scheduler.gens = dict(data.get("gens", {}))
+        scheduler.heap = [list(e) for e in data.get("heap", [])]
+        heapq.heapify(scheduler.heap)
+        for entry in scheduler.heap:
+            if scheduler._is_live(entry):
+                key = scheduler._key(entry[3], entry[4])
+                scheduler.live[key] = scheduler.live.get(key, 0) + 1
+            else:
+                scheduler.stale += 1
+        return scheduler
+
+
+def load_scheduler(data_dir: Path, lead_minutes: int) -> Optional[ReminderScheduler]:
+    try:
+        with open(data_dir / REMINDERS_FILE_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    return ReminderScheduler.from_json(data, lead_minutes)
+
+
+def save_scheduler(scheduler: ReminderScheduler, data_dir: Path) -> None:
+    save_json(scheduler.to_json(), data_dir / REMINDERS_FILE_NAME)
+
+
+def build_reminder_notification(due: List[Dict], lead_minutes: int) -> str:
+    """Одне повідомлення на всі нагадування цього запуску."""
+    if not due:
+        return ""
+
+    def hhmm(minute: int) -> str:
+        dt = minute_to_datetime(minute)
+        return f"{dt.hour}:{dt.minute:02d}"
+
+    parts = [f"⏰ За ~{lead_minutes} хв відключення!", ""]
+    for item in sorted(due, key=lambda x: (x["start"], queue_sort_key(x["queue"]))):
+        parts.append(f"Черга {item['queue']}: 🪫{hhmm(item['start'])}-{hhmm(item['end'])}")
+    return "\n".join(parts)
@@ -0,0 +1,189 @@
+"""
+Офлайн-прогін історичних знімків через build_state → build_diff → повідомлення.
+
+Джерела знімків (norm_by_queue, формат data/current.json):
+    --git data/current.json    — усі версії файлу з історії git (за замовчуванням)
+    --dir snapshots/           — усі *.json у каталозі, за іменем
+Мережа не потрібна; Telegram не викликається. Кожне повідомлення, яке
+пішло б у канал, пишеться JSON-рядком у stdout (або --out), а наприкінці
+в stderr друкується пропускна здатність по етапах.
+
+Запуск: python replay.py [--git data/current.json | --dir DIR] [--out FILE]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from log_utils import muted_logs
+from monitor import (
+    build_changes_notification,
+    build_diff,
+    build_new_schedule_notification,
+    build_state,
+)
+from schedule_core import build_changes_index, build_outage_index, update_summaries
+
+Snapshot = Tuple[str, Dict[str, List[Dict]]]
+
+
+def iter_git_snapshots(path: str, rev: str = "HEAD") -> Iterator[Snapshot]:
+    """
+    Версії файлу від найстарішої до найновішої.
+    Один процес `git cat-file --batch` на весь прогін — без git show на кожен коміт.
+    """
+    commits = subprocess.run(
+        ["git", "rev-list", "--reverse", rev, "--", path],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+
+    proc = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    try:
+        for sha in commits:
+            proc.stdin.write(f"{sha}:{path}\n".encode())
+            proc.stdin.flush()
+            header = proc.stdout.readline().decode().split()
+            if len(header) < 3 or header[1] == "missing":
+                continue
+            body = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # завершальний \n
+            try:
+                yield sha[:10], json.loads(body)
+            except ValueError:
+                print(f"⚠️ {sha[:10]}: пошкоджений JSON, пропускаю", file=sys.stderr)
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+
+def iter_dir_snapshots(directory: Path) -> Iterator[Snapshot]:
+    for path in sorted(directory.glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield path.name, json.load(f)
+        except ValueError:
+            print(f"⚠️ {path.name}: пошкоджений JSON, пропускаю", file=sys.stderr)
+
+
+def replay(
+    snapshots: Iterator[Snapshot],
+    out,
+    url: str = "",
+    subscribe: str = "",
+    site_name: str = "ЖОЕ",
+) -> Dict:
+    """Проганяє знімки попарно, як послідовні запуски monitor.py. Повертає статистику."""
+    stats = {
+        "snapshots": 0, "records": 0, "diffs": 0, "messages": 0,
+        "state_s": 0.0, "diff_s": 0.0, "render_s": 0.0,
+    }
+    last_state: Optional[Dict] = None
+
+    for snapshot_id, norm_by_queue in snapshots:
+        stats["snapshots"] += 1
+        stats["records"] += sum(len(v) for v in norm_by_queue.values())
+
+        t0 = time.perf_counter()
+        norm_by_queue, main_hashes, span_hashes = build_state(norm_by_queue, {})
+        t1 = time.perf_counter()
+        stats["state_s"] += t1 - t0
+
+        if last_state is None:
+            # Як перший запуск: лише запам'ятовуємо стан
+            last_state = {
+                "main_hashes": main_hashes,
+                "span_hashes": span_hashes,
+                "summaries": update_summaries({}, norm_by_queue, span_hashes, {}),
+                "norm_by_queue": norm_by_queue,
+            }
+            continue
+
+        diff = build_diff(norm_by_queue, main_hashes, span_hashes, last_state)
+        summaries = update_summaries(last_state["summaries"], norm_by_queue, span_hashes, diff)
+        t2 = time.perf_counter()
+        stats["diff_s"] += t2 - t1
+
+        messages = []
+        if diff["queues"] or diff["new_dates"]:
+            stats["diffs"] += 1
+            changes_msg = build_changes_notification(
+                diff, url, subscribe, "", site_name, build_changes_index(diff),
+                summaries, last_state["summaries"],
+            )
+            new_queues = [q for q in diff["queues"] if diff["per_queue"][q]["new_dates"]]
+            new_msg = build_new_schedule_notification(
+                diff, build_outage_index(norm_by_queue, new_queues), url, subscribe, "", site_name
+            )
+            if changes_msg:
+                messages.append({"kind": "changes", "text": changes_msg})
+            if new_msg:
+                messages.append({"kind": "new_schedule", "text": new_msg})
+        stats["render_s"] += time.perf_counter() - t2
+
+        for message in messages:
+            stats["messages"] += 1
+            out.write(json.dumps(
+                {"snapshot": snapshot_id, "queues": diff["queues"], **message},
+                ensure_ascii=False,
+            ) + "\n")
+
+        # Як у run_provider: хеші з поточного запуску, previous.json — поточні дані
+        last_state = {
+            "main_hashes": main_hashes,
+            "span_hashes": span_hashes,
+            "summaries": summaries,
+            "norm_by_queue": norm_by_queue,
+        }
+
+    return stats
+
+
+def print_stats(stats: Dict, elapsed: float) -> None:
+    err = sys.stderr
+    print(
+        f"📊 Знімків: {stats['snapshots']}, записів: {stats['records']}, "
+        f"змін: {stats['diffs']}, повідомлень: {stats['messages']}",
+        file=err,
+    )
+    print(f"⏱ Загалом {elapsed:.2f} с (з читанням знімків)", file=err)
+    for stage in ("state", "diff", "render"):
+        seconds = stats[f"{stage}_s"]
+        rate = stats["snapshots"] / seconds if seconds else float("inf")
+        print(f"   {stage:7s} {seconds:8.3f} с  {rate:10,.0f} знімків/с", file=err)
+    if elapsed:
+        print(f"   {stats['records'] / elapsed:,.0f} записів/с наскрізно", file=err)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Офлайн-прогін історичних знімків графіка")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--git", metavar="PATH", default="data/current.json",
+                        help="файл стану в історії git (за замовчуванням data/current.json)")
+    source.add_argument("--dir", metavar="DIR", type=Path, help="каталог зі знімками *.json")
+    parser.add_argument("--rev", default="HEAD", help="до якої ревізії брати історію")
+    parser.add_argument("--out", type=Path, help="куди писати повідомлення (JSONL), за замовчуванням stdout")
+    parser.add_argument("--url", default="")
+    parser.add_argument("--subscribe", default="")
+    args = parser.parse_args()
+
+    snapshots = iter_dir_snapshots(args.dir) if args.dir else iter_git_snapshots(args.git, args.rev)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+
+    started = time.perf_counter()
+    try:
+        with muted_logs():
+            stats = replay(snapshots, out, args.url, args.subscribe)
+    finally:
+        if args.out:
+            out.close()
+    print_stats(stats, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+import os
+import re
+import json
+import codecs
+import hashlib
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Лише стандартна бібліотека: модуль використовують і легкі утиліти без requests/telegram
+
+# Спільне для monitor.py і probe.py, щоб вони не розходились
+HASH_FILE_NAME = "last_hash.json"
+# Скільки запитів до API виконуються одночасно
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+RESPONSE_CHUNK_SIZE = 8192
+
+# outage_index[date][queue_key] -> [(start, end), ...]
+OutageIndex = Dict[str, Dict[str, List[Tuple[str, str]]]]
+# changes_index[date][queue_key] -> [{"start", "end", "change"}, ...]
+ChangesIndex = Dict[str, Dict[str, List[Dict]]]
+# summaries[queue_key][date] -> {"outage_minutes", "windows", "first", "last"}
+Summaries = Dict[str, Dict[str, Dict]]
+
+MINUTES_PER_DAY = 24 * 60
+DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d")
+
+try:
+    from zoneinfo import ZoneInfo
+    LOCAL_TZ = ZoneInfo("Europe/Kyiv")
+except Exception:
+    LOCAL_TZ = None
+
+
+def save_json(data, path) -> None:
+    """Атомарний запис: спочатку тимчасовий файл, потім os.replace."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def calculate_hash(obj) -> str:
+    json_str = json.dumps(obj, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(json_str.encode("utf-8")).hexdigest()
+
+
+def normalize_record(rec: Dict, cherga_id: int, pidcherga_id: int) -> Dict:
+    """Нормалізація одного запису."""
+    date = rec.get("date", "")
+    span = rec.get("span", "")
+    color = rec.get("color", "").strip().lower()
+
+    return {
+        "cherga": cherga_id,
+        "pidcherga": pidcherga_id,
+        "queue_key": f"{cherga_id}.{pidcherga_id}",
+        "date": date,
+        "span": span,
+        "color": color,
+    }
+
+
+def rows_main_hash(rows: Iterable[Tuple[str, str, str]]) -> str:
+    """Головний хеш черги з відсортованих кортежів (date, span, color)."""
+    main_hash_data = [{"date": d, "span": s, "color": c} for d, s, c in rows]
+    return calculate_hash(main_hash_data)
+
+
+def queue_main_hash(norm_list: List[Dict]) -> str:
+    """Головний хеш черги з відсортованих нормалізованих записів."""
+    return rows_main_hash((r["date"], r["span"], r["color"]) for r in norm_list)
+
+
+# Верхня межа розміру відповіді однієї черги
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+
+SPAN_RE = re.compile(r"^\d{2}:?\d{2}-\d{2}:?\d{2}$")
+# Символи, на яких сканеру треба зупинитись усередині об'єкта / рядка
+_OBJECT_SPECIAL_RE = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+# Кінець скалярного елемента масиву (null, 1, true ...)
+_SCALAR_END_RE = re.compile(r"[,\]\s]")
+
+
+class ScheduleParseError(ValueError):
+    """Відповідь загалом непридатна: перевищено ліміт або зламана структура."""
+
+
+def iter_json_objects(
+    chunks: Iterable[Union[bytes, str]],
+    max_bytes: int = MAX_RESPONSE_BYTES,
+) -> Iterator[str]:
+    """
+    Потоково виділяє верхньорівневі елементи з відповіді виду
+    [{...}, {...}] або одиночного {...}. У пам'яті тримається лише
+    поточний елемент, тож пам'ять не росте з довжиною відповіді.
+    Кожен елемент повертається сирим текстом — розбір і валідація окремо,
+    тож скаляр у масиві ([{...}, null]) відкидається як окремий запис.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    received = 0
+    in_array = False
+    depth = 0            # глибина всередині поточного елемента
+    in_string = False
+    string_value = False  # елемент масиву — сам рядок, а не об'єкт
+    in_scalar = False     # елемент масиву — число/літерал
+    escaped = False
+    seen_json = False    # чи був хоч один [ або {
+    finished = False     # верхньорівневе значення завершене — далі лише пробіли
+    parts: List[str] = []
+
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            received += len(chunk)
+            text = decoder.decode(chunk)
+        else:
+            received += len(chunk.encode("utf-8"))
+            text = chunk
+        if received > max_bytes:
+            raise ScheduleParseError(f"Відповідь більша за {max_bytes} байт")
+
+        pos = 0
+        n = len(text)
+        while pos < n:
+            if in_scalar:
+                match = _SCALAR_END_RE.search(text, pos)
+                if match is None:
+                    parts.append(text[pos:])
+                    break
+                parts.append(text[pos:match.start()])
+                pos = match.start()
+                in_scalar = False
+                yield "".join(parts)
+                parts = []
+                continue
+
+            if depth == 0:
+                ch = text[pos]
+                if ch.isspace() or ch == "\ufeff":
+                    pos += 1
+                elif finished:
+                    # [...][...] або {...}{...}: json.loads теж таке відкидав
+                    raise ScheduleParseError(f"Зайві дані {ch!r} після кінця відповіді")
+                elif ch == "," and in_array:
+                    pos += 1
+                elif ch == "[" and not in_array:
+                    in_array = True
+                    seen_json = True
+                    pos += 1
+                elif ch == "]" and in_array:
+                    in_array = False
+                    finished = True
+                    pos += 1
+                elif ch == "{" or (ch == "[" and in_array):
+                    depth = 1
+                    seen_json = True
+                    parts = [ch]
+                    pos += 1
+                elif ch == '"' and in_array:
+                    depth = 1
+                    in_string = True
+                    string_value = True
+                    parts = [ch]
+                    pos += 1
+                elif in_array:
+                    in_scalar = True
+                    parts = []
+                else:
+                    raise ScheduleParseError(f"Неочікуваний символ {ch!r} поза записом")
+                continue
+
+            if escaped:
+                # Символ після "\" у рядку — пропускаємо без аналізу
+                parts.append(text[pos])
+                escaped = False
+                pos += 1
+                continue
+
+            pattern = _STRING_SPECIAL_RE if in_string else _OBJECT_SPECIAL_RE
+            match = pattern.search(text, pos)
+            if match is None:
+                parts.append(text[pos:])
+                break
+
+            end = match.end()
+            parts.append(text[pos:end])
+            ch = match.group()
+            pos = end
+
+            if in_string:
+                if ch == "\\":
+                    escaped = True
+                else:
+                    in_string = False
+                    if string_value:
+                        string_value = False
+                        depth = 0
+                        yield "".join(parts)
+                        parts = []
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    finished = not in_array
+                    yield "".join(parts)
+                    parts = []
+
+    if depth or in_string:
+        raise ScheduleParseError("Відповідь обірвана посеред запису")
+    if in_array:
+        # Обрив між записами: інакше коротший графік видавався б за повний
+        raise ScheduleParseError("Відповідь обірвана: масив не закрито")
+    if not seen_json:
+        raise ScheduleParseError("Порожня відповідь")
+
+
+def validate_record(rec) -> Optional[str]:
+    """Повертає причину відхилення запису або None, якщо запис коректний."""
+    if not isinstance(rec, dict):
+        return "запис не є об'єктом"
+    for field in ("date", "span", "color"):
+        if not isinstance(rec.get(field), str):
+            return f"поле {field} відсутнє або не рядок"
+    if not rec["date"].strip():
+        return "порожня дата"
+    if not SPAN_RE.match(rec["span"]):
+        return f"некоректний span {rec['span']!r}"
+    return None
+
+
+def iter_schedule_records(
+    chunks: Iterable[Union[bytes, str]],
+    cherga_id: int,
+    pidcherga_id: int,
+    rejected: Optional[List[str]] = None,
+    max_bytes: int = MAX_RESPONSE_BYTES,
+) -> Iterator[Dict]:
+    """
+    Потоковий розбір відповіді API: записи нормалізуються по мірі надходження.
+    Зіпсований запис відкидається поодинці (причина — в rejected),
+    решта черги лишається. ScheduleParseError — якщо зламана вся відповідь.
+    """
+    for index, raw in enumerate(iter_json_objects(chunks, max_bytes)):
+        try:
+            rec = json.loads(raw)
+        except ValueError as e:
+            reason = f"невалідний JSON ({e})"
+        else:
+            reason = validate_record(rec)
+            if reason is None:
+                yield normalize_record(rec, cherga_id, pidcherga_id)
+                continue
+        if rejected is not None:
+            rejected.append(f"#{index}: {reason}")
+
+
+def parse_span(span: str) -> Tuple[str, str]:
+    """0000-0030 або 00:00-00:30 -> (00:00, 00:30)"""
+    if not span or "-" not in span:
+        return ("", "")
+    start, end = span.split("-")
+    # Якщо вже є двокрапка, повертаємо як є
+    if ":" in start:
+        return start, end
+    return f"{start[:2]}:{start[2:]}", f"{end[:2]}:{end[2:]}"
+
+
+def parse_date(value: str) -> Optional[Date]:
+    """18.01.2026 або 2026-01-18 -> date; None якщо формат невідомий."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def span_minutes(span: str) -> Optional[Tuple[int, int]]:
+    """00:00-00:30 -> (0, 30); кінець 00:00/24:00 означає кінець доби."""
+    start, end = parse_span(span)
+    try:
+        start_min = int(start[:2]) * 60 + int(start[3:5])
+        end_min = int(end[:2]) * 60 + int(end[3:5])
+    except ValueError:
+        return None
+    if end_min <= start_min:
+        end_min += MINUTES_PER_DAY
+    return start_min, end_min
+
+
+def day_minute(day: Date) -> int:
+    """Хвилина початку доби на спільній шкалі (місцевий час, без TZ)."""
+    return day.toordinal() * MINUTES_PER_DAY
+
+
+def local_now() -> datetime:
+    """Поточний київський час без tzinfo — у тій самій шкалі, що й графік."""
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None) if LOCAL_TZ else datetime.now()
+
+
+def minute_to_datetime(minute: int) -> datetime:
+    return datetime.fromordinal(minute // MINUTES_PER_DAY) + timedelta(
+        minutes=minute % MINUTES_PER_DAY
+    )
+
+
+def datetime_to_minute(value: datetime) -> int:
+    return day_minute(value.date()) + value.hour * 60 + value.minute
+
+
+def outage_intervals(norm_list: List[Dict]) -> List[Tuple[int, int]]:
+    """
+    Відключення черги як відсортовані злиті інтервали [start, end)
+    у хвилинах на спільній шкалі (див. day_minute).
+    """
+    intervals: List[Tuple[int, int]] = []
+    for rec in norm_list:
+        if rec.get("color") != "red":
+            continue
+        day = parse_date(rec.get("date", ""))
+        minutes = span_minutes(rec.get("span", ""))
+        if day is None or minutes is None:
+            continue
+        base = day_minute(day)
+        intervals.append((base + minutes[0], base + minutes[1]))
+
+    intervals.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def format_time(value: str) -> str:
+    """05:30 -> 5:30, 00:00 -> 0:00 (компактний вигляд для повідомлень)."""
+    value = value.lstrip("0") or "0:00"
+    if value.startswith(":"):
+        value = "0" + value
+    return value
+
+
+def queue_sort_key(queue_key: str) -> Tuple[int, ...]:
+    """Числове сортування черг: 2.1 < 10.1."""
+    return tuple(map(int, queue_key.split(".")))
+
+
+def build_outage_index(
+    norm_by_queue: Dict[str, List[Dict]],
+    queues: Optional[List[str]] = None,
+) -> OutageIndex:
+    """
+    Один прохід по записах: дата -> черга -> злиті діапазони відключень.
+    Записи всередині черги вже відсортовані build_state за (date, span),
+    тож сусідні "red"-інтервали зливаються без повторного сортування.
+    """
+    index: OutageIndex = {}
+
+    for queue_key in (queues if queues is not None else norm_by_queue.keys()):
+        current_date = None
+        ranges: List[Tuple[str, str]] = []
+
+        for rec in norm_by_queue.get(queue_key, []):
+            if rec["date"] != current_date:
+                current_date = rec["date"]
+                ranges = []
+            if rec["color"] != "red":
+                continue
+
+            start, end = parse_span(rec["span"])
+            if not ranges:
+                # Дата потрапляє в індекс лише якщо має хоч одне відключення
+                index.setdefault(current_date, {})[queue_key] = ranges
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+
+    return index
+
+
+def build_changes_index(diff: Dict) -> ChangesIndex:
+    """Один прохід по diff["per_queue"]: дата -> черга -> згруповані зміни."""
+    index: ChangesIndex = {}
+    for queue_key, info in diff.get("per_queue", {}).items():
+        for date, ranges in info.get("changed_dates", {}).items():
+            if ranges:
+                index.setdefault(date, {})[queue_key] = ranges
+    return index
+
+
+def summarize_dates(norm_list: List[Dict], dates: Optional[set] = None) -> Dict[str, Dict]:
+    """
+    Підсумок по датах черги: хвилини без світла, кількість вікон,
+    перше й останнє вікно. dates=None — усі дати, інакше лише вказані.
+    Вікна зливаються в межах дати, як у build_outage_index.
+    """
+    result: Dict[str, Dict] = {}
+    current_date = None
+    summary: Optional[Dict] = None
+
+    for rec in norm_list:
+        date = rec["date"]
+        if dates is not None and date not in dates:
+            continue
+        if date != current_date:
+            current_date = date
+            summary = {"outage_minutes": 0, "windows": 0, "first": None, "last": None}
+            result[date] = summary
+        if rec["color"] != "red":
+            continue
+
+        minutes = span_minutes(rec["span"])
+        if minutes is None:
+            continue
+        start, end = parse_span(rec["span"])
+        summary["outage_minutes"] += minutes[1] - minutes[0]
+        if summary["last"] and summary["last"][1] == start:
+            summary["last"] = [summary["last"][0], end]
+        else:
+            summary["windows"] += 1
+            summary["last"] = [start, end]
+        if summary["windows"] == 1:
+            summary["first"] = summary["last"]
+
+    return result
+
+
+def update_summaries(
+    prev_summaries: Summaries,
+    norm_by_queue: Dict[str, List[Dict]],
+    span_hashes: Dict[str, Dict[str, Dict[str, str]]],
+    diff: Dict,
+) -> Summaries:
+    """
+    Інкрементне оновлення підсумків: перераховуються лише дати з
+    diff["dirty_dates"] (змінені хеші інтервалів) і нові черги,
+    решта копіюється з попереднього стану. Дати, яких більше немає, відкидаються.
+    """
+    dirty = diff.get("dirty_dates", {})
+    summaries: Summaries = {}
+
+    for queue_key, records in norm_by_queue.items():
+        prev = prev_summaries.get(queue_key)
+        if prev is None:
+            summaries[queue_key] = summarize_dates(records)
+            continue
+
+        current_dates = span_hashes.get(queue_key, {})
+        queue_summary = {d: v for d, v in prev.items() if d in current_dates}
+        recompute = set(dirty.get(queue_key, []))
+        # Дата без підсумку (напр. підсумки з'явились пізніше за дату) — теж рахуємо
+        recompute.update(d for d in current_dates if d not in queue_summary)
+        if recompute:
+            queue_summary.update(summarize_dates(records, recompute))
+        summaries[queue_key] = queue_summary
+
+    return summaries
+
+
+def format_minutes(minutes: int) -> str:
+    """90 -> "1 год 30 хв", 60 -> "1 год", 30 -> "30 хв"."""
+    hours, mins = divmod(abs(minutes), 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} год")
+    if mins or not hours:
+        parts.append(f"{mins} хв")
+    return " ".join(parts)
@@ -1,4 +1,3 @@
-import os
 import hashlib
 from io import BytesIO
 from typing import Tuple, Optional
@@ -8,15 +7,13 @@ from playwright.sync_api import sync_playwright
 from PIL import Image
 from log_utils import log_to_buffer
 
-URL = os.getenv("URL")
-
-def get_schedule_content() -> Tuple[Optional[str], Optional[str]]:
+def get_schedule_content(url: str) -> Tuple[Optional[str], Optional[str]]:
     """Повертає дату оновлення."""
     try:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page(viewport={"width": 1920, "height": 3080})
-            page.goto(URL, wait_until="networkidle", timeout=30000)
+            page.goto(url, wait_until="networkidle", timeout=30000)
             page_content = page.content()
             browser.close()
             soup = BeautifulSoup(page_content, "html.parser")
@@ -40,14 +37,17 @@ def get_schedule_content() -> Tuple[Optional[str], Optional[str]]:
         log_to_buffer(f"❌ Помилка Playwright при читанні тексту: {e}")
         return None, None
 
-def take_screenshot_between_elements() -> Tuple[Optional[str], Optional[str]]:
+def take_screenshot_between_elements(
+    url: str,
+    screenshot_path: str = "screenshot.png",
+) -> Tuple[Optional[str], Optional[str]]:
     """Робить скріншот: між 'Дата оновлення інформації' та 'робіт'."""
     try:
         log_to_buffer("📸 Створюю скріншот проміжку між елементами...")
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page(viewport={"width": 1920, "height": 3080})
-            page.goto(URL, wait_until="networkidle", timeout=30000)
+            page.goto(url, wait_until="networkidle", timeout=30000)
             date_element = page.locator("text=/Дата оновлення інформації/").first
             end_element = page.locator("text=/робіт/").last
             if date_element.count() == 0:
@@ -77,7 +77,6 @@ def take_screenshot_between_elements() -> Tuple[Optional[str], Optional[str]]:
                 log_to_buffer("❌ Некоректна висота області для скріншота")
                 return None, None
             cropped_image = image.crop((x, start_y, x + width, end_y))
-            screenshot_path = "screenshot.png"
             cropped_image.save(screenshot_path)
             screenshot_hash = hashlib.md5(cropped_image.tobytes()).hexdigest()
             log_to_buffer(f"✅ Скріншот створено. Хеш: {screenshot_hash}")
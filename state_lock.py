@@ -0,0 +1,34 @@
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+LOCK_NAME = ".lock"
+
+
+@contextmanager
+def state_lock(data_dir: Path):
+    """
+    Advisory-лок (flock) на каталог зі станом.
+    Не чекає: якщо інший запуск уже тримає лок — повертає False,
+    і викликач має відступити, а не перезаписувати стан.
+    """
+    data_dir.mkdir(parents=True, exist_ok=True)
+    lock_file = open(data_dir / LOCK_NAME, "a+")
+    try:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    finally:
+        lock_file.close()
@@ -1,7 +1,6 @@
 import os
 import logging
 from pathlib import Path
-import asyncio
 from telegram import Bot
 from telegram.error import TelegramError
 
@@ -58,27 +57,18 @@ async def send_photo(image_path: Path, caption: str = None,
         return False
 
 
-def send_notification(message: str, image_path: Path = None) -> bool:
+async def send_notification_async(message: str, image_path: Path = None,
+                                  channel_id: str = TELEGRAM_CHANNEL_ID) -> bool:
     """
-    Синхронна обгортка для відправлення.
     Якщо є картинка — шле повідомлення З картинкою (без дублювання).
     Якщо нема картинки — шле просто текст.
     """
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            if image_path and image_path.exists():
-                # Шле тільки картинку з caption (одне повідомлення)
-                loop.run_until_complete(send_photo(image_path, caption=message))
-            else:
-                # Шле тільки текст
-                loop.run_until_complete(send_message(message))
-            
-            return True
-        finally:
-            loop.close()
+        if image_path and image_path.exists():
+            # Шле тільки картинку з caption (одне повідомлення)
+            return await send_photo(image_path, caption=message, channel_id=channel_id)
+        # Шле тільки текст
+        return await send_message(message, channel_id=channel_id)
     except Exception as e:
         logger.error(f"❌ Помилка відправлення: {e}")
         return False